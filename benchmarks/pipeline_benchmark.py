@@ -0,0 +1,179 @@
+# Time each public function of svg_to_geojson_final on synthetic floor plans
+# of increasing size and save the results, so a commit can be compared with
+# an earlier one without real FMSystems SVGs.
+#
+# Results are written to benchmarks/results/<commit>.json.
+#
+# How to Run
+# python benchmarks/pipeline_benchmark.py
+# python benchmarks/pipeline_benchmark.py --sizes 100,1000 --compare benchmarks/results/abc1234.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import shapely
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from svg_to_geojson_final import (
+    read_svg,
+    load_svg,
+    simplify_geojson,
+    remove_duplicate_polygons,
+    remove_covered_polygons,
+    combine_overlapping_polygons,
+    get_room_tags,
+    get_match_polygons,
+    to_geojson,
+    from_geojson,
+)
+from simplify_benchmark import best_time
+from synthetic_floorplan import rooms_for_paths, write_floorplan
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DEFAULT_SIZES = "100,1000,10000,50000"
+
+
+def git_commit():
+    """Short hash of the checked out commit, marked if the tree is dirty"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def benchmark_size(svg_file, repeat):
+    """Best time of each function on one floor plan, in pipeline order"""
+    # Run the pipeline once to get each function's real input
+    with contextlib.redirect_stdout(io.StringIO()):
+        svg = read_svg(svg_file)
+        loaded = load_svg(svg)
+        simplified = simplify_geojson(loaded)
+        deduplicated = remove_duplicate_polygons(simplified)
+        uncovered = remove_covered_polygons(deduplicated)
+        combined = combine_overlapping_polygons(uncovered)
+        matched = get_match_polygons(svg, combined, strict=False)
+    feature_collection = to_geojson(matched)
+
+    cases = [
+        ("read_svg", read_svg, svg_file),
+        ("load_svg", load_svg, svg),
+        ("simplify_geojson", simplify_geojson, loaded),
+        ("remove_duplicate_polygons", remove_duplicate_polygons, simplified),
+        ("remove_covered_polygons", remove_covered_polygons, deduplicated),
+        ("combine_overlapping_polygons", combine_overlapping_polygons, uncovered),
+        ("get_room_tags", get_room_tags, svg),
+        (
+            "get_match_polygons",
+            lambda floor: get_match_polygons(svg, floor, strict=False),
+            combined,
+        ),
+        ("to_geojson", to_geojson, matched),
+        ("from_geojson", from_geojson, feature_collection),
+    ]
+    times = {}
+    for name, function, data in cases:
+        times[name] = best_time(function, lambda: data, repeat)
+    counts = {
+        "paths": len(svg.paths),
+        "room_tags": len(svg.room_tags),
+        "polygons": len(combined),
+    }
+    return times, counts
+
+
+def print_table(results, baseline=None):
+    for size, result in results.items():
+        counts = result["counts"]
+        print(
+            f"\n{size} paths ({counts['paths']} generated, "
+            f"{counts['room_tags']} labels, {counts['polygons']} polygons)"
+        )
+        base_times = (baseline or {}).get(size, {}).get("seconds", {})
+        for name, seconds in result["seconds"].items():
+            line = f"  {name:<30} {seconds * 1000:>10.1f} ms"
+            if name in base_times:
+                line += f"  {seconds / base_times[name]:>6.2f}x baseline"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark svg_to_geojson_final on synthetic floor plans"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help=f"comma-separated numbers of SVG paths (default: {DEFAULT_SIZES})",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", help="results file (default: benchmarks/results/<commit>.json)"
+    )
+    parser.add_argument(
+        "--compare", metavar="RESULTS", help="earlier results file to compare with"
+    )
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            svg_file = os.path.join(tmp_dir, f"synthetic-{size}.svg")
+            write_floorplan(svg_file, rooms_for_paths(size), seed=args.seed)
+            print(f"Benchmarking {size} paths...")
+            times, counts = benchmark_size(svg_file, args.repeat)
+            results[str(size)] = {"seconds": times, "counts": counts}
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "shapely": shapely.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        baseline = previous["results"]
+        print(f"\nComparing with {previous['commit']} ({args.compare})")
+    print_table(results, baseline)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
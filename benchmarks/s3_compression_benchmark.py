@@ -0,0 +1,175 @@
+# Compare uncompressed, gzip and brotli JSON objects: stored size, local
+# compress/decompress throughput and, with --upload, upload and download
+# throughput through s3_utils against the S3 endpoint in .env (point it at a
+# local MinIO). br is skipped unless the brotli package is installed.
+#
+# Inputs are local JSON files or folders of them and/or objects already in
+# the bucket, so the mix can match what we actually push.
+#
+# How to Run
+# python benchmarks/s3_compression_benchmark.py json_files
+# python benchmarks/s3_compression_benchmark.py --s3-object floorplans/placements.json --s3-object floorplans/buildings.json --upload
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import s3_utils
+from s3_utils import (
+    COMPRESSIONS,
+    brotli,
+    encode_json_buffer,
+    get_json_from_s3,
+    save_upload_json_file,
+)
+
+BENCHMARK_PREFIX = "benchmarks/compression"
+
+
+def json_paths(paths):
+    """JSON files in paths, expanding folders"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found += [
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if name.endswith(".json")
+                ]
+        else:
+            found.append(path)
+    return found
+
+
+def load_objects(paths, s3_objects):
+    """(name, JSON data) of each benchmark object"""
+    objects = []
+    for path in json_paths(paths):
+        with open(path, "r", encoding="utf-8") as f:
+            objects.append((os.path.basename(path), json.load(f)))
+    for name in s3_objects:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = get_json_from_s3(name, return_data=True)
+        if data is None:
+            raise SystemExit(f"Could not get {name} from S3")
+        objects.append((os.path.basename(name), data))
+    return objects
+
+
+def decompress(data, compression):
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "br":
+        return brotli.decompress(data)
+    return data
+
+
+def best_seconds(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_compression(objects, compression, repeat, upload):
+    """Total sizes and throughputs of all objects with one compression"""
+    raw_bytes = stored_bytes = 0
+    seconds = {"compress": 0.0, "decompress": 0.0, "upload": 0.0, "download": 0.0}
+    for name, data in objects:
+        raw = encode_json_buffer(data).getvalue()
+        stored = encode_json_buffer(data, compression=compression).getvalue()
+        raw_bytes += len(raw)
+        stored_bytes += len(stored)
+        if compression:
+            seconds["compress"] += best_seconds(
+                lambda: encode_json_buffer(data, compression=compression), repeat
+            )
+            seconds["decompress"] += best_seconds(
+                lambda: decompress(stored, compression), repeat
+            )
+
+        if upload:
+            # End to end: serialize, compress and upload; download, decode
+            # and parse
+            s3_object_name = f"{BENCHMARK_PREFIX}/{compression or 'none'}/{name}"
+            seconds["upload"] += best_seconds(
+                lambda: save_upload_json_file(
+                    s3_object_name, data, in_memory=True, compression=compression
+                ),
+                repeat,
+            )
+            seconds["download"] += best_seconds(
+                lambda: get_json_from_s3(s3_object_name, return_data=True), repeat
+            )
+            s3_utils.client.remove_object(s3_utils.bucket_name, s3_object_name)
+
+    # Throughputs are in megabytes of uncompressed JSON per second
+    megabytes = raw_bytes / 1e6
+    return {
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "ratio": stored_bytes / raw_bytes if raw_bytes else None,
+        "mb_per_second": {
+            stage: megabytes / stage_seconds
+            for stage, stage_seconds in seconds.items()
+            if stage_seconds
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark compressed JSON objects for s3_utils uploads"
+    )
+    parser.add_argument("paths", nargs="*", help="JSON files or folders")
+    parser.add_argument(
+        "--s3-object", action="append", default=[], help="bucket object to include"
+    )
+    parser.add_argument(
+        "--upload",
+        action="store_true",
+        help=f"also time uploads and downloads under {BENCHMARK_PREFIX}/",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    objects = load_objects(args.paths, args.s3_object)
+    if not objects:
+        parser.error("no JSON files or S3 objects to benchmark")
+    # Read straight from S3, not from a local cache
+    s3_utils.s3_cache_dir = None
+
+    compressions = [None] + [c for c in COMPRESSIONS if c != "br" or brotli]
+    print(f"{len(objects)} objects")
+    print(
+        f"  {'encoding':<10} {'bytes':>12} {'ratio':>7} "
+        f"{'compress':>10} {'decompress':>11} {'upload':>9} {'download':>9}  (MB/s)"
+    )
+    for compression in compressions:
+        result = benchmark_compression(objects, compression, args.repeat, args.upload)
+        rates = result["mb_per_second"]
+        columns = [
+            f"{rates[stage]:.1f}" if stage in rates else "-"
+            for stage in ("compress", "decompress", "upload", "download")
+        ]
+        print(
+            f"  {compression or 'none':<10} {result['stored_bytes']:>12} "
+            f"{result['ratio']:>7.3f} {columns[0]:>10} {columns[1]:>11} "
+            f"{columns[2]:>9} {columns[3]:>9}"
+        )
+    if not brotli:
+        print("br skipped: the brotli package is not installed")
+
+
+if __name__ == "__main__":
+    main()
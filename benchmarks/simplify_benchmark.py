@@ -0,0 +1,93 @@
+# Benchmark the vectorized simplify_geojson against the previous per-point
+# implementation on a floor SVG.
+#
+# How to Run
+# python benchmarks/simplify_benchmark.py svg_files/Ansys-a-map.svg
+
+import argparse
+import contextlib
+import copy
+import io
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from svg_to_geojson_final import load_svg, simplify_geojson, to_geojson
+
+
+def reference_simplify_ring(ring, tol=1e-6):
+    """The per-point simplify_ring that simplify_geojson used to run"""
+    new_ring = []
+    for i in range(len(ring) - 1):
+        if ring[i] != ring[i + 1]:
+            new_ring.append(ring[i])
+    new_ring.append(ring[-1])
+    ring = new_ring
+    if len(ring) == 1:
+        return ring
+    closed = ring[0] == ring[-1]
+    coords = ring[:-1] if closed else ring[:]
+    if len(coords) <= 2:
+        return ring
+
+    simplified = [coords[0]]
+    for i in range(1, len(coords) - 1):
+        (x1, y1), (x2, y2), (x3, y3) = simplified[-1], coords[i], coords[i + 1]
+        if abs((x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)) >= tol:
+            simplified.append(coords[i])
+    simplified.append(coords[-1])
+    if closed:
+        simplified.append(simplified[0])
+    return simplified
+
+
+def reference_simplify_geojson(gj):
+    keep_features = []
+    for feature in gj["features"]:
+        ring = reference_simplify_ring(feature["geometry"]["coordinates"][0])
+        feature["geometry"]["coordinates"][0] = ring
+        if len(ring) > 2:
+            keep_features.append(feature)
+    gj["features"] = keep_features
+    return gj
+
+
+def best_time(function, make_input, repeat):
+    """Best wall time of function over fresh inputs from make_input"""
+    times = []
+    for _ in range(repeat):
+        data = make_input()
+        with contextlib.redirect_stdout(io.StringIO()):
+            times.append(timeit.timeit(lambda: function(data), number=1))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time simplify_geojson against the per-point implementation"
+    )
+    parser.add_argument("svg_file", nargs="?", default="svg_files/Ansys-a-map.svg")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        floor = load_svg(args.svg_file)
+    gj = to_geojson(floor)
+    rings = [feature["geometry"]["coordinates"][0] for feature in gj["features"]]
+    n_points = sum(len(ring) for ring in rings)
+    print(f"{args.svg_file}: {len(rings)} rings, {n_points} points")
+
+    # The per-point version works on GeoJSON rings, the vectorized one on the
+    # floor's coordinate arrays, as each runs in its pipeline
+    reference = best_time(
+        reference_simplify_geojson, lambda: copy.deepcopy(gj), args.repeat
+    )
+    vectorized = best_time(simplify_geojson, lambda: floor, args.repeat)
+    print(f"per-point:  {reference * 1000:.1f} ms")
+    print(f"vectorized: {vectorized * 1000:.1f} ms")
+    print(f"speedup:    {reference / vectorized:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# Deterministic synthetic floor plan SVGs in the FMSystems layer style:
+# room outlines in an A-AREA group and room number labels in A-AREA-IDEN.
+# Rooms sit on a grid; some get curved walls, duplicated outlines, small
+# covered polygons inside them or polygons overlapping them, and a few
+# open paths are mixed in, so every stage of svg_to_geojson_final has work.
+#
+# How to Run
+# python benchmarks/synthetic_floorplan.py 1000 svg_files/Synthetic-1-map.svg
+
+import argparse
+import random
+
+# Grid cell of each room in SVG units; rooms fill most of it
+CELL_SIZE = 100.0
+
+
+def room_path(x, y, w, h, rng, curve_rate):
+    """d string of a rectangular room, possibly with one curved wall"""
+    kind = rng.random()
+    if kind < curve_rate / 2:
+        # Shallow arc along the right wall that stays inside the grid cell
+        return f"M{x},{y} L{x + w},{y} A{2 * h},{2 * h} 0 0 1 {x + w},{y + h} L{x},{y + h} Z"
+    if kind < curve_rate:
+        # Cubic Bezier along the top wall
+        return (
+            f"M{x},{y} C{x + w / 3},{y - 10} {x + 2 * w / 3},{y - 10} {x + w},{y} "
+            f"L{x + w},{y + h} L{x},{y + h} Z"
+        )
+    # Straight walls, with a colinear midpoint for simplify_geojson to drop
+    return f"M{x},{y} L{x + w / 2},{y} L{x + w},{y} L{x + w},{y + h} L{x},{y + h} Z"
+
+
+def rectangle_path(x0, y0, x1, y1):
+    return f"M{x0},{y0} L{x1},{y0} L{x1},{y1} L{x0},{y1} Z"
+
+
+def generate_floorplan(
+    n_rooms,
+    seed=0,
+    duplicate_rate=0.1,
+    overlap_rate=0.1,
+    covered_rate=0.1,
+    curve_rate=0.2,
+    open_rate=0.05,
+    label_rate=0.9,
+):
+    """Return the SVG text of a synthetic floor plan with n_rooms rooms"""
+    rng = random.Random(seed)
+    columns = int(n_rooms**0.5) + 1
+    paths = []
+    labels = []
+
+    for k in range(n_rooms):
+        x = (k % columns) * CELL_SIZE
+        y = (k // columns) * CELL_SIZE
+        w = 80 + rng.random() * 10
+        h = 80 + rng.random() * 10
+
+        d = room_path(x, y, w, h, rng, curve_rate)
+        paths.append(d)
+        if rng.random() < duplicate_rate:
+            paths.append(d)
+        if rng.random() < covered_rate:
+            paths.append(rectangle_path(x + 10, y + 10, x + 30, y + 30))
+        if rng.random() < overlap_rate:
+            # Sticks out of the room but stays inside its grid cell
+            paths.append(rectangle_path(x + 60, y + 20, x + w + 5, y + 60))
+        if rng.random() < open_rate:
+            paths.append(f"M{x},{y} L{x + 5},{y + 5}")
+        if rng.random() < label_rate:
+            labels.append((x + 40, y + 40, f"{1000 + k}"))
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>']
+    lines.append('<svg xmlns="http://www.w3.org/2000/svg">')
+    lines.append('<g id="A-AREA">')
+    lines.extend(f'<path d="{d}"/>' for d in paths)
+    lines.append("</g>")
+    lines.append('<g id="A-AREA-IDEN">')
+    lines.extend(f'<text x="{x}" y="{y}">{name}</text>' for x, y, name in labels)
+    lines.append("</g>")
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def rooms_for_paths(
+    n_paths, duplicate_rate=0.1, overlap_rate=0.1, covered_rate=0.1, open_rate=0.05
+):
+    """Number of rooms that gives about n_paths paths at these rates"""
+    paths_per_room = 1 + duplicate_rate + overlap_rate + covered_rate + open_rate
+    return max(1, round(n_paths / paths_per_room))
+
+
+def write_floorplan(path, n_rooms, **options):
+    """Write a synthetic floor plan to path and return its number of paths"""
+    svg = generate_floorplan(n_rooms, **options)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(svg)
+    return svg.count("<path ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic floor plan SVG")
+    parser.add_argument("n_rooms", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--overlap-rate", type=float, default=0.1)
+    parser.add_argument("--covered-rate", type=float, default=0.1)
+    parser.add_argument("--curve-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    n_paths = write_floorplan(
+        args.output,
+        args.n_rooms,
+        seed=args.seed,
+        duplicate_rate=args.duplicate_rate,
+        overlap_rate=args.overlap_rate,
+        covered_rate=args.covered_rate,
+        curve_rate=args.curve_rate,
+    )
+    print(f"Wrote {args.output}: {args.n_rooms} rooms, {n_paths} paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Compact encoding of a floor's room JSON (the output of geojson_to_rooms).
+# Coordinates become integers on a per-floor grid (scale and offset), each
+# ring is delta-encoded against its previous point, and the file is written
+# without indentation. decode_compact_floor gives back the exact rooms dict.
+#
+# How to Run (decode a compact file to the regular room JSON)
+# python compact_floor.py output_files/Ansys-1-map.json json_files/Ansys-1-map.json
+
+import argparse
+import json
+
+from geojson_to_json import COORDINATE_PRECISION, write_rooms_json
+
+COMPACT_FORMAT = "cmumaps-compact-floor"
+COMPACT_VERSION = 1
+
+# Integer grid units per coordinate unit; coordinates are already rounded
+# to COORDINATE_PRECISION places, so quantizing to this grid is lossless
+SCALE = 10**COORDINATE_PRECISION
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def quantize(value):
+    return round(value * SCALE)
+
+
+def encode_ring(points, offset):
+    """Flat [x0, y0, dx1, dy1, ...] of a ring's points on the integer grid"""
+    encoded = []
+    previous = offset
+    for x, y in points:
+        qx, qy = quantize(x), quantize(y)
+        encoded += [qx - previous[0], qy - previous[1]]
+        previous = (qx, qy)
+    return encoded
+
+
+def decode_ring(encoded, offset):
+    """Points of a ring from encode_ring's output"""
+    points = []
+    qx, qy = offset
+    for i in range(0, len(encoded), 2):
+        qx += encoded[i]
+        qy += encoded[i + 1]
+        points.append((qx / SCALE, qy / SCALE))
+    return points
+
+
+def encode_compact_floor(rooms):
+    """Encode a rooms dict (as written by write_rooms_json) compactly"""
+    rings = {
+        room_id: [(p[0]["longitude"], p[0]["latitude"]) for p in room["coordinates"]]
+        for room_id, room in rooms.items()
+    }
+    points = [point for ring in rings.values() for point in ring]
+    # The floor's lower-left corner, so ring starts stay small numbers
+    offset = (
+        [min(quantize(x) for x, _ in points), min(quantize(y) for _, y in points)]
+        if points
+        else [0, 0]
+    )
+
+    levels = {room["floor"]["level"] for room in rooms.values()}
+    level = levels.pop() if len(levels) == 1 else None
+
+    encoded_rooms = []
+    for room_id in sorted(rooms):
+        room = rooms[room_id]
+        encoded = {
+            "id": room_id,
+            "name": room["name"],
+            "type": room["type"],
+            "ring": encode_ring(rings[room_id], offset),
+        }
+        label = room["labelPosition"]
+        if is_number(label["longitude"]) and is_number(label["latitude"]):
+            encoded["label"] = [
+                quantize(label["longitude"]) - offset[0],
+                quantize(label["latitude"]) - offset[1],
+            ]
+        else:
+            # Unlabelled rooms carry polygon points here; keep them as is
+            encoded["labelPosition"] = label
+        if level is None:
+            encoded["level"] = room["floor"]["level"]
+        encoded_rooms.append(encoded)
+
+    return {
+        "format": COMPACT_FORMAT,
+        "version": COMPACT_VERSION,
+        "scale": SCALE,
+        "offset": offset,
+        "level": level,
+        "rooms": encoded_rooms,
+    }
+
+
+def decode_compact_floor(data):
+    """Rooms dict in the regular schema from encode_compact_floor's output"""
+    if data.get("format") != COMPACT_FORMAT or data.get("version") != COMPACT_VERSION:
+        raise ValueError("Not a compact floor file of a supported version")
+    if data["scale"] != SCALE:
+        raise ValueError(f"Unsupported compact floor scale {data['scale']}")
+    offset = data["offset"]
+
+    rooms = dict()
+    for encoded in data["rooms"]:
+        if "label" in encoded:
+            qx, qy = encoded["label"]
+            label_position = {
+                "longitude": (offset[0] + qx) / SCALE,
+                "latitude": (offset[1] + qy) / SCALE,
+            }
+        else:
+            label_position = encoded["labelPosition"]
+
+        elements = dict()
+        elements["name"] = encoded["name"]
+        elements["labelPosition"] = label_position
+        elements["type"] = encoded["type"]
+        elements["id"] = encoded["id"]
+        elements["coordinates"] = [
+            [{"longitude": x, "latitude": y}]
+            for x, y in decode_ring(encoded["ring"], offset)
+        ]
+        elements["floor"] = {"level": encoded.get("level", data["level"])}
+        rooms[elements["id"]] = elements
+    return rooms
+
+
+def write_compact_floor(rooms, output_file):
+    """Write rooms in the compact encoding"""
+    with open(output_file, "w", encoding="utf-8") as json_file:
+        json.dump(
+            encode_compact_floor(rooms),
+            json_file,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+
+
+def load_floor(input_file):
+    """Load a floor's rooms from either a compact or a regular room JSON"""
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") == COMPACT_FORMAT:
+        return decode_compact_floor(data)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Decode a compact floor file to the regular room JSON"
+    )
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    write_rooms_json(load_floor(args.input), args.output)
+    print(f"Decoded {args.input} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
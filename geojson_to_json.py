@@ -1,46 +1,131 @@
 import geojson
-import json
+import hashlib
 import uuid
 import os
 
+from json_stream import JsonObjectStream, dump_stream
+
+# Namespace of the uuid5 room IDs; changing it changes every room ID
+ROOM_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "cmumaps/rooms")
+
+# Decimal places kept for every coordinate in the output
+COORDINATE_PRECISION = 6
+
+
+def round_floats(value, precision=COORDINATE_PRECISION):
+    """Round every float in a (possibly nested) list to precision places"""
+    if isinstance(value, float):
+        # Adding 0.0 turns -0.0 (from flipping y) into 0.0
+        return round(value, precision) + 0.0
+    if isinstance(value, (list, tuple)):
+        return [round_floats(v, precision) for v in value]
+    return value
+
+
+def geometry_hash(ring):
+    """SHA-256 of a ring's coordinates in a fixed text format"""
+    text = ";".join(
+        f"{x:.{COORDINATE_PRECISION}f},{y:.{COORDINATE_PRECISION}f}" for x, y in ring
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def room_id(building, level, name, ring):
+    """Deterministic ID of a room from where it is, its name and its shape"""
+    key = f"{building}/{level}/{name}/{geometry_hash(ring)}"
+    return str(uuid.uuid5(ROOM_ID_NAMESPACE, key))
+
+
+def feature_to_room(feature, level, room_id):
+    """Convert a GeoJSON room feature to the room JSON schema"""
+    properties = feature["properties"]
+    ring = round_floats(feature["geometry"]["coordinates"][0])
+    label_position = round_floats(properties["labelPosition"])
+
+    elements = dict()
+    elements["name"] = properties["room_name"]
+    elements["labelPosition"] = dict()
+    elements["labelPosition"]["longitude"] = label_position[0]
+    elements["labelPosition"]["latitude"] = label_position[1]
+    elements["type"] = properties["room_type"]
+    elements["id"] = room_id
+    elements["coordinates"] = []
+    elements["floor"] = dict()
+    elements["floor"]["level"] = level
+
+    for polygon in ring:
+        poly_cord = []
+        p = dict()
+        p["longitude"] = polygon[0]
+        p["latitude"] = polygon[1]
+        poly_cord.append(p)
+        elements["coordinates"].append(poly_cord)
+    return elements
+
+
+def room_ids(geojson_data, building, level):
+    """Deterministic ID of every room feature of a floor, in feature order"""
+    ids = []
+    seen = set()
+    for feature in geojson_data["features"]:
+        ring = round_floats(feature["geometry"]["coordinates"][0])
+        name = feature["properties"]["room_name"]
+        new_id = base_id = room_id(building, level, name, ring)
+        # Identical rooms would share an ID; number the repeats instead
+        repeat = 1
+        while new_id in seen:
+            new_id = str(uuid.uuid5(ROOM_ID_NAMESPACE, f"{base_id}/{repeat}"))
+            repeat += 1
+        seen.add(new_id)
+        ids.append(new_id)
+    return ids
+
+
+def iter_rooms(geojson_data, base_name):
+    """
+    Yield (id, room) for the room features of a floor (base_name like
+    "Ansys-1-map") in ID order, building each room only when it is needed
+    """
+    building, level = base_name.split("-")[:2]
+    ids = room_ids(geojson_data, building, level)
+    features = geojson_data["features"]
+    for i in sorted(range(len(ids)), key=ids.__getitem__):
+        yield ids[i], feature_to_room(features[i], level, ids[i])
+
+
+def geojson_to_rooms(geojson_data, base_name):
+    """Dict of the rooms of a floor keyed by their deterministic IDs"""
+    return dict(iter_rooms(geojson_data, base_name))
+
+
+def write_rooms_json(rooms, output_file):
+    """
+    Write rooms, a dict or (id, room) pairs in ID order such as iter_rooms
+    gives, one room at a time so the same rooms always give the same bytes
+    """
+    if isinstance(rooms, dict):
+        rooms = sorted(rooms.items())
+    with open(output_file, "w", encoding="utf-8") as json_file:
+        dump_stream(
+            JsonObjectStream(rooms),
+            json_file,
+            ensure_ascii=False,
+            indent=4,
+            sort_keys=True,
+        )
+
 
 def main():
     file_name = "Ansys-1-map_updated.geojson"
     with open(os.path.join("geojson_files", file_name), "r", encoding="utf-8") as f:
         polygons = geojson.load(f)
 
-    rooms = dict()
-
-    for feature in polygons["features"]:
-        elements = dict()
-        elements["name"] = feature["properties"]["room_name"]
-        elements["labelPosition"] = dict()
-        elements["labelPosition"]["longitude"] = feature["properties"]["labelPosition"][
-            0
-        ]
-        elements["labelPosition"]["latitude"] = feature["properties"]["labelPosition"][
-            1
-        ]
-        elements["type"] = feature["properties"]["room_type"]
-        elements["id"] = str(uuid.uuid4())
-        elements["coordinates"] = []
-        elements["floor"] = dict()
-        elements["floor"]["level"] = file_name.split("-")[1]
-        # print(elements['floor']['level'])
-
-        for polygon in feature["geometry"]["coordinates"][0]:
-            poly_cord = []
-            p = dict()
-            p["longitude"] = polygon[0]
-            p["latitude"] = polygon[1]
-            poly_cord.append(p)
-            elements["coordinates"].append(poly_cord)
-        rooms[elements["id"]] = elements
+    base_name = file_name.replace("_updated.geojson", "")
+    rooms = iter_rooms(polygons, base_name)
 
     output_file = file_name.replace("_updated.geojson", ".json")
     output_file_name = os.path.join("json_files", output_file)
-    with open(output_file_name, "w", encoding="utf-8") as json_file:
-        json.dump(rooms, json_file, ensure_ascii=False, indent=4)
+    write_rooms_json(rooms, output_file_name)
     print(
         f"GeoJSON file {file_name} converted to JSON file {output_file_name} successfully."
     )
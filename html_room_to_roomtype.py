@@ -1,27 +1,83 @@
-from bs4 import BeautifulSoup
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
 import geojson
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
-def main():
-    file_name = "Ansys-d-map.html"
+# Room rows have a span with id <row>_3 holding the room number and one
+# with id <row>_4 holding the room type
+ROOM_SPAN_ID = re.compile(r"^(.*)_([34])$")
 
-    # Load your HTML file
 
-    with open(f"html_files/{file_name}", "r", encoding="utf-8") as f:
-        soup = BeautifulSoup(f, "html.parser")
+def iter_room_spans(html_file):
+    """
+    Yield (id, text) of every span whose id ends in _3 or _4, in document
+    order, in one streaming pass (with lxml if installed).
+    """
+    if etree is None:
+        with open(html_file, "r", encoding="utf-8") as f:
+            strainer = SoupStrainer("span", id=ROOM_SPAN_ID)
+            soup = BeautifulSoup(f, "html.parser", parse_only=strainer)
+        for span in soup.find_all("span"):
+            yield span["id"], span.get_text(strip=True)
+        return
+
+    # Clear each element once parsed, except inside a span whose text is
+    # still to be read (clearing also drops an element's tail text)
+    span_depth = 0
+    # The crawled fragments declare no charset; read them as UTF-8 like the
+    # fallback does, not libxml2's default of Latin-1
+    for event, elem in etree.iterparse(
+        html_file, events=("start", "end"), html=True, encoding="utf-8"
+    ):
+        if elem.tag == "span":
+            span_depth += 1 if event == "start" else -1
+        if event == "start":
+            continue
+        if elem.tag == "span":
+            span_id = elem.get("id")
+            if span_id and ROOM_SPAN_ID.match(span_id):
+                # Same text as BeautifulSoup's get_text(strip=True)
+                text = "".join(s.strip() for s in elem.itertext())
+                yield span_id, text
+        if span_depth == 0:
+            elem.clear()
+
+
+def extract_room_types(html_file):
+    """
+    Map each room number in a room list HTML to its room type, pairing the
+    _3 and _4 spans of a row by their shared id prefix.
+    """
+    numbers = {}
+    types = {}
+    for span_id, text in iter_room_spans(html_file):
+        prefix, column = ROOM_SPAN_ID.match(span_id).groups()
+        if column == "3":
+            numbers[prefix] = text
+        else:
+            types[prefix] = text
 
-    # Initialize dictionary for mapping
     room_map = {}
+    for prefix, room_number in numbers.items():
+        if prefix in types:
+            room_map[room_number] = types[prefix]
+
+    unpaired = len(numbers.keys() ^ types.keys())
+    if unpaired:
+        print(f"Warning: {unpaired} room spans in {html_file} have no pair")
+    return room_map
+
 
-    # Find all spans with id ending in '_3' and '_4'
-    spans_3 = soup.find_all("span", id=lambda x: x and x.endswith("_3"))
-    spans_4 = soup.find_all("span", id=lambda x: x and x.endswith("_4"))
+def main():
+    file_name = "Ansys-d-map.html"
 
-    # Iterate and extract mapping
-    for room_span, name_span in zip(spans_3, spans_4):
-        room_number = room_span.get_text(strip=True)
-        room_name = name_span.get_text(strip=True)
-        room_map[room_number] = room_name
+    # Map room numbers to room types
+    room_map = extract_room_types(f"html_files/{file_name}")
 
     # Example: print mapping
     for k, v in room_map.items():
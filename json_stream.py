@@ -0,0 +1,217 @@
+# Streaming JSON writer for large outputs (room files, building and graph
+# data). Wrap a generator in JsonObjectStream or JsonArrayStream and the
+# records are encoded and written one at a time, so the full output never
+# has to exist in memory. The bytes match json.dump with the same options.
+#
+# Streams may be the top-level value or a direct value of a plain dict or
+# list, e.g. {"floor_level": 2, "pairs": JsonArrayStream(pairs)}.
+#
+# iter_json_object goes the other way, yielding the top-level key/value
+# pairs of a large JSON object from a file or S3 response one at a time.
+
+import codecs
+import io
+import json
+
+
+class JsonObjectStream:
+    def __init__(self, items):
+        # Iterable of (key, value) pairs, written in the order given
+        self.items = items
+
+
+class JsonArrayStream:
+    def __init__(self, items):
+        # Iterable of values, written in the order given
+        self.items = items
+
+
+STREAM_TYPES = (JsonObjectStream, JsonArrayStream)
+
+
+def has_stream(value):
+    """True if value is a stream or a dict/list directly holding one"""
+    if isinstance(value, STREAM_TYPES):
+        return True
+    if isinstance(value, dict):
+        return any(isinstance(v, STREAM_TYPES) for v in value.values())
+    if isinstance(value, list):
+        return any(isinstance(v, STREAM_TYPES) for v in value)
+    return False
+
+
+def iter_json_chunks(
+    value, indent=None, ensure_ascii=True, sort_keys=False, separators=None, _level=0
+):
+    """Yield the JSON text of value in chunks, one record at a time"""
+    if separators is None:
+        separators = (", ", ": ") if indent is None else (",", ": ")
+    item_separator, key_separator = separators
+
+    encoder = json.JSONEncoder(
+        indent=indent,
+        ensure_ascii=ensure_ascii,
+        sort_keys=sort_keys,
+        separators=separators,
+    )
+
+    def dumps(v, level):
+        # iterencode yields small pieces, as json.dump writes them, so a
+        # large plain value is never built as one string
+        for text in encoder.iterencode(v):
+            if indent is not None:
+                # Nested values are indented one level per enclosing container
+                text = text.replace("\n", "\n" + " " * (indent * level))
+            yield text
+
+    if not has_stream(value):
+        yield from dumps(value, _level)
+        return
+
+    if isinstance(value, JsonObjectStream):
+        pairs, brackets = value.items, "{}"
+    elif isinstance(value, dict):
+        pairs = sorted(value.items()) if sort_keys else value.items()
+        brackets = "{}"
+    elif isinstance(value, JsonArrayStream):
+        pairs, brackets = ((None, v) for v in value.items), "[]"
+    else:
+        pairs, brackets = ((None, v) for v in value), "[]"
+
+    if indent is None:
+        newline = close_newline = ""
+    else:
+        newline = "\n" + " " * (indent * (_level + 1))
+        close_newline = "\n" + " " * (indent * _level)
+
+    empty = True
+    for key, item in pairs:
+        yield (brackets[0] if empty else item_separator) + newline
+        empty = False
+        if brackets == "{}":
+            if not isinstance(key, str):
+                key = json.dumps(key)
+            yield json.dumps(key, ensure_ascii=ensure_ascii) + key_separator
+        if has_stream(item):
+            yield from iter_json_chunks(
+                item, indent, ensure_ascii, sort_keys, separators, _level + 1
+            )
+        else:
+            yield from dumps(item, _level + 1)
+    yield brackets if empty else close_newline + brackets[1]
+
+
+def dump_stream(value, fp, **options):
+    """Write value to a text file as JSON, one record at a time"""
+    for chunk in iter_json_chunks(value, **options):
+        fp.write(chunk)
+
+
+class JsonStreamReader(io.RawIOBase):
+    """
+    Binary file-like object that reads the JSON of value as it is encoded,
+    for uploading without a local file (e.g. Minio put_object).
+    """
+
+    def __init__(self, value, encoding="utf-8", **options):
+        self.chunks = iter_json_chunks(value, **options)
+        self.encoding = encoding
+        self.buffer = bytearray()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self.buffer) < len(b):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk.encode(self.encoding)
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        del self.buffer[:n]
+        return n
+
+
+# Characters read from the input at a time when decoding
+DECODE_CHUNK_SIZE = 1 << 20
+
+WHITESPACE = " \t\n\r"
+
+# Characters that can follow a complete key or value
+VALUE_DELIMITERS = set(WHITESPACE + ",:}]")
+
+
+def iter_json_object(fp, predicate=None, chunk_size=DECODE_CHUNK_SIZE):
+    """
+    Yield the (key, value) pairs of the top-level JSON object in fp (a text
+    or binary file, or an S3 response) one at a time, so only one value is
+    in memory at once. If predicate is given, only pairs for which
+    predicate(key, value) is true are yielded.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    state = {"buffer": "", "pos": 0, "eof": False}
+
+    def read_more(size):
+        """Append at least size more characters, dropping what was parsed"""
+        state["buffer"] = state["buffer"][state["pos"] :]
+        state["pos"] = 0
+        data = fp.read(size)
+        if isinstance(data, bytes):
+            data = utf8.decode(data, final=not data)
+        if not data:
+            state["eof"] = True
+        state["buffer"] += data
+
+    def next_char():
+        """Skip whitespace and return the next character ("" at the end)"""
+        while True:
+            buffer, pos = state["buffer"], state["pos"]
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buffer) or state["eof"]:
+                return buffer[pos : pos + 1]
+            read_more(chunk_size)
+
+    def expect(char):
+        if next_char() != char:
+            raise ValueError(f"Expected {char!r} in JSON object stream")
+        state["pos"] += 1
+
+    def decode_value():
+        """Decode the value at pos, reading more until it is complete"""
+        size = chunk_size
+        while True:
+            next_char()
+            try:
+                buffer = state["buffer"]
+                value, end = decoder.raw_decode(buffer, state["pos"])
+                # A value is only complete if a delimiter follows it; a
+                # number cut off by the buffer (e.g. "1." of "1.5") is not
+                if state["eof"] or buffer[end : end + 1] in VALUE_DELIMITERS:
+                    state["pos"] = end
+                    return value
+            except json.JSONDecodeError:
+                if state["eof"]:
+                    raise
+            # Read at least as much again as is pending, so a large value is
+            # decoded a bounded number of times
+            read_more(max(size, len(state["buffer"]) - state["pos"]))
+            size *= 2
+
+    expect("{")
+    if next_char() == "}":
+        return
+    while True:
+        key = decode_value()
+        expect(":")
+        value = decode_value()
+        if predicate is None or predicate(key, value):
+            yield key, value
+        del value
+        char = next_char()
+        if char == "}":
+            return
+        expect(",")
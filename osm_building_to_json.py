@@ -25,6 +25,7 @@
 
 import xml.etree.ElementTree as ET
 import json, math, heapq, os
+from json_stream import JsonObjectStream, dump_stream
 
 # Input
 OSM_FILE = "export.osm 2"
@@ -327,35 +328,49 @@ def assemble_entry(osm_id, code, name, defaultFloor, tags, shapes, rings, way_no
     }
 
 # Collect buildings
-buildings, outer_ways_used={}, set()
-
-# Relations (multipolygon buildings)
-for rel in relations:
-    if "building" not in rel["tags"]: continue
-    osm_id = rel["id"]
-    if osm_id in osm_id_to_info:
-        info = osm_id_to_info[osm_id]
-        outer=[m["ref"] for m in rel["members"] if m["type"]=="way" and m.get("role")=="outer"]
-        if not outer: outer=[m["ref"] for m in rel["members"] if m["type"]=="way"]
-        shapes,rings,nodesets=[],[],[]
-        for wid in outer:
+def iter_building_sources():
+    """Yield (code, osm_id, tags, shapes, rings, nodesets) of each building with a shape, without assembling it."""
+    outer_ways_used=set()
+
+    # Relations (multipolygon buildings)
+    for rel in relations:
+        if "building" not in rel["tags"]: continue
+        osm_id = rel["id"]
+        if osm_id in osm_id_to_info:
+            outer=[m["ref"] for m in rel["members"] if m["type"]=="way" and m.get("role")=="outer"]
+            if not outer: outer=[m["ref"] for m in rel["members"] if m["type"]=="way"]
+            shapes,rings,nodesets=[],[],[]
+            for wid in outer:
+                shape,ring,nids=shape_from_way(wid)
+                if shape: shapes.append(shape); rings.append(ring); nodesets.append(set(nids)); outer_ways_used.add(wid)
+            if shapes:
+                yield osm_id_to_info[osm_id]["code"], osm_id, rel["tags"], shapes, rings, nodesets
+
+    # Standalone ways (not already used)
+    for wid,w in ways_by_id.items():
+        if "building" not in w["tags"] or wid in outer_ways_used: continue
+        if wid in osm_id_to_info:
             shape,ring,nids=shape_from_way(wid)
-            if shape: shapes.append(shape); rings.append(ring); nodesets.append(set(nids)); outer_ways_used.add(wid)
-        if shapes:
-            entry=assemble_entry(osm_id, info["code"], info["name"], info["defaultFloor"], rel["tags"],shapes,rings,nodesets)
-            buildings[entry["code"]]=entry
-
-# Standalone ways (not already used)
-for wid,w in ways_by_id.items():
-    if "building" not in w["tags"] or wid in outer_ways_used: continue
-    if wid in osm_id_to_info:
-        info = osm_id_to_info[wid]
-        shape,ring,nids=shape_from_way(wid)
-        if shape:
-            entry=assemble_entry(wid, info["code"], info["name"], info["defaultFloor"], w["tags"],[shape],[ring],[set(nids)])
-            buildings[entry["code"]]=entry
-
-# Write JSON
-with open(PARSED_DATA_OUTPUT_JSON,"w") as f: json.dump(buildings,f,indent=4)
-print(f"Saved {len(buildings)} buildings to {PARSED_DATA_OUTPUT_JSON}")
+            if shape:
+                yield osm_id_to_info[wid]["code"], wid, w["tags"], [shape], [ring], [set(nids)]
+
+def building_sources():
+    """Map each building code to its source; a repeated code keeps its first position but its last source."""
+    sources={}
+    for code, *source in iter_building_sources():
+        if code in sources:
+            print(f"Duplicate building code {code}; keeping the later entry")
+        sources[code]=source
+    return sources
+
+def assemble_building(osm_id, tags, shapes, rings, nodesets):
+    info = osm_id_to_info[osm_id]
+    return assemble_entry(osm_id, info["code"], info["name"], info["defaultFloor"], tags,shapes,rings,nodesets)
+
+# Write JSON, assembling one building at a time
+sources=building_sources()
+with open(PARSED_DATA_OUTPUT_JSON,"w") as f:
+    buildings=((code, assemble_building(*source)) for code, source in sources.items())
+    dump_stream(JsonObjectStream(buildings),f,indent=4)
+print(f"Saved {len(sources)} buildings to {PARSED_DATA_OUTPUT_JSON}")
 analyze_missing_buildings()
\ No newline at end of file
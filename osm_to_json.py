@@ -6,6 +6,7 @@ from geopy import distance
 import math
 import sys
 import argparse
+from json_stream import JsonArrayStream, dump_stream, iter_json_object
 
 
 DISTANCE_THRESHOLD_METERS = 10.0  #threshold for the distance, adjust if needed
@@ -16,18 +17,32 @@ def load_graph_data(file_path="downloaded_all_graphs.json"):
     with open(file_path, 'r') as f:
         return json.load(f)
 
+def stream_graph_data(file_path="downloaded_all_graphs.json", predicate=None):
+    """Yield (node_id, node_data) from the graph JSON file one node at a time"""
+    print(f"Streaming {file_path}...")
+    with open(file_path, 'rb') as f:
+        yield from iter_json_object(f, predicate)
+
+def is_floor_node(node_data, floor_level):
+    """True if a node is on the given floor and has a coordinate"""
+    return ('floor' in node_data and
+            'coordinate' in node_data and
+            node_data['floor'].get('level') == str(floor_level))
+
 def extract_floor_nodes(graph_data, floor_level):
-    """Extract all nodes from a specific floor level"""
+    """Extract all nodes from a specific floor level
+
+    graph_data is either the whole graph dict or (node_id, node_data) pairs,
+    e.g. from stream_graph_data or s3_utils.iter_json_from_s3, so the whole
+    graph never has to be loaded
+    """
     floor_nodes = {}
-    floor_level_str = str(floor_level)
     
     print(f"Extracting floor level {floor_level} nodes from graph data...")
-    
-    for node_id, node_data in graph_data.items():
-        if ('floor' in node_data and 
-            'coordinate' in node_data and 
-            node_data['floor'].get('level') == floor_level_str):
-            
+
+    pairs = graph_data.items() if isinstance(graph_data, dict) else graph_data
+    for node_id, node_data in pairs:
+        if is_floor_node(node_data, floor_level):
             floor_nodes[node_id] = node_data
     
     print(f"Found {len(floor_nodes)} nodes on floor level {floor_level}")
@@ -174,19 +189,22 @@ def save_results(entrance_pairs, floor_level, floor_nodes, osm_entrances, output
         'distance_threshold_meters': DISTANCE_THRESHOLD_METERS,
         'floor_nodes_count': len(floor_nodes),
         'osm_entrances_count': len(osm_entrances),
-        'pairs': entrance_pairs
+        # Written one pair at a time
+        'pairs': JsonArrayStream(entrance_pairs)
     }
 
     with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
+        dump_stream(output_data, f, indent=2)
 
     print(f"\nResults saved to '{output_file}'")
     return output_file
 
-graph_data = load_graph_data("downloaded_all_graphs.json")
-
-#Change it to a floor you need
-floor_2_nodes = extract_floor_nodes(graph_data, 2)
+#Change it to a floor you need; only that floor's nodes are kept in memory
+floor_2_nodes = extract_floor_nodes(
+    stream_graph_data("downloaded_all_graphs.json",
+                      predicate=lambda node_id, node_data: is_floor_node(node_data, 2)),
+    2
+)
 
 #parsing osm
 osm_entrances = parse_osm_entrances("export (1).osm")
@@ -1,45 +1,53 @@
 import os
+import io
+import argparse
+import hashlib
+import cProfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import geojson
 
-from svg_to_geojson_final import (
-    load_svg, simplify_geojson, remove_duplicate_polygons,
-    remove_covered_polygons, combine_overlapping_polygons, get_match_polygons
-)
-from bs4 import BeautifulSoup
+from svg_to_geojson_final import read_svg, get_match_polygons, to_geojson
+from stage_cache import StageCache, file_hash, run_geometry_stages
+from run_report import FloorReport, run_stage, append_report
+from html_room_to_roomtype import extract_room_types
+from geojson_to_json import geojson_to_rooms, iter_rooms, write_rooms_json
+from compact_floor import write_compact_floor
 import json
-import uuid
 
-def process_svg_to_geojson(svg_file_path):
-    """Process SVG file and return GeoJSON data"""
-    gj = load_svg(svg_file_path)
-    gj = simplify_geojson(gj)
-    gj = remove_duplicate_polygons(gj)
-    gj = remove_covered_polygons(gj)
-    gj = combine_overlapping_polygons(gj)
-    feature_collection = get_match_polygons(svg_file_path, gj, strict=False)
+# Records the input hashes of every floor built, so unchanged floors are skipped
+MANIFEST_FILE = os.path.join("output_files", "build_manifest.json")
 
-    return feature_collection
+# Source files whose content makes up the pipeline code version
+PIPELINE_SOURCES = [
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "svg_to_geojson_final.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "stage_cache.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_room_to_roomtype.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "geojson_to_json.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "compact_floor.py"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_stream.py"),
+]
 
-def process_html_room_types(html_file_path, geojson_data):
-    """Process HTML file to add room types to GeoJSON"""
+# cProfile data of each floor goes here with --profile
+PROFILE_DIR = os.path.join("output_files", "profiles")
 
-    # Load your HTML file
-    
-    with open(html_file_path, "r", encoding="utf-8") as f:
-        soup = BeautifulSoup(f, "html.parser")
+def process_svg_to_geojson(svg_file_path, cache=None, report=None):
+    """Process SVG file and return GeoJSON data"""
+    # Parse the SVG once and share it between the geometry and matching stages
+    svg = run_stage(report, read_svg, svg_file_path)
+    # load_svg through combine_overlapping_polygons, from checkpoints if cached
+    floor = run_geometry_stages(svg_file_path, svg, cache, report)
+    floor = run_stage(report, get_match_polygons, svg, floor, strict=False)
 
-    # Initialize dictionary for mapping
-    room_map = {}
+    # Geometry stays in Shapely arrays between stages; convert only here
+    return to_geojson(floor)
 
-    # Find all spans with id ending in '_3' and '_4'
-    spans_3 = soup.find_all("span", id=lambda x: x and x.endswith("_3"))
-    spans_4 = soup.find_all("span", id=lambda x: x and x.endswith("_4"))
+def process_html_room_types(html_file_path, geojson_data):
+    """Process HTML file to add room types to GeoJSON"""
 
-    # Iterate and extract mapping
-    for room_span, name_span in zip(spans_3, spans_4):
-        room_number = room_span.get_text(strip=True)
-        room_name = name_span.get_text(strip=True)
-        room_map[room_number] = room_name
+    # Map room numbers to room types in one streaming pass over the HTML
+    room_map = extract_room_types(html_file_path)
 
     # Iterate over each feature in the GeoJSON
     for feature in geojson_data["features"]:
@@ -57,66 +65,217 @@ def process_html_room_types(html_file_path, geojson_data):
 
     return geojson_data
 
-def process_geojson_to_json(geojson_data, base_name):
-    """Convert GeoJSON to final JSON format"""
-
-    rooms = dict()
-
-    for feature in geojson_data["features"]:
-        elements = dict()
-        elements["name"] = feature["properties"]["room_name"]
-        elements["labelPosition"] = dict()
-        elements["labelPosition"]["longitude"] = feature["properties"]["labelPosition"][
-            0
-        ]
-        elements["labelPosition"]["latitude"] = feature["properties"]["labelPosition"][
-            1
-        ]
-        elements["type"] = feature["properties"]["room_type"]
-        elements["id"] = str(uuid.uuid4())
-        elements["coordinates"] = []
-        elements["floor"] = dict()
-        elements["floor"]["level"] = base_name.split("-")[1]
-        
-        for polygon in feature["geometry"]["coordinates"][0]:
-            poly_cord = []
-            p = dict()
-            p["longitude"] = polygon[0]
-            p["latitude"] = polygon[1]
-            poly_cord.append(p)
-            elements["coordinates"].append(poly_cord)
-        rooms[elements["id"]] = elements
+def process_geojson_to_json(geojson_data, base_name, compact=False):
+    """Convert GeoJSON to final JSON format (or its compact encoding)"""
 
+    # Room IDs and output bytes depend only on the input, so unchanged
+    # floors give identical files
     output_file = os.path.join("output_files", f"{base_name}.json")
-    with open(output_file, "w", encoding="utf-8") as json_file:
-        json.dump(rooms, json_file, ensure_ascii=False, indent=4)
+    if compact:
+        # The compact encoding needs the whole floor for its offset
+        write_compact_floor(geojson_to_rooms(geojson_data, base_name), output_file)
+    else:
+        # Rooms are built and written one at a time
+        write_rooms_json(iter_rooms(geojson_data, base_name), output_file)
 
     print(f"JSON file {output_file} created successfully.")
 
-def process_file_pair(svg_file, html_file):
+def process_file_pair(svg_file, html_file, cache=None, report=None, profile=False, compact=False):
     """Process a pair of SVG and HTML files through the pipeline"""
 
     base_name = os.path.splitext(svg_file)[0]
     svg_file_path = os.path.join("svg_files", svg_file)
     html_file_path = os.path.join("html_files", html_file)
     os.makedirs("output_files", exist_ok=True)
+
+    profiler = None
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
     
     try:
-        geojson_data = process_svg_to_geojson(svg_file_path)
+        geojson_data = process_svg_to_geojson(svg_file_path, cache, report)
 
-        geojson_data = process_html_room_types(html_file_path, geojson_data)
+        geojson_data = run_stage(report, process_html_room_types, html_file_path, geojson_data)
         
-        process_geojson_to_json(geojson_data, base_name)
+        run_stage(report, process_geojson_to_json, geojson_data, base_name, compact)
 
         print(f"Successfully processed {base_name}")
+        return True
 
     except Exception as e:
         print(f"Error processing {base_name}: {e}")
-        return
+        return False
+
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{base_name}.prof"))
+
+def process_file_pair_reported(
+    svg_file, html_file, cache=None, with_report=False, profile=False, compact=False,
+    trace_memory=False
+):
+    """Process a file pair, returning its success and its report record (or None)"""
+
+    report = None
+    if with_report:
+        report = FloorReport(os.path.splitext(svg_file)[0], trace_memory)
+    success = process_file_pair(svg_file, html_file, cache, report, profile, compact)
+    return success, report.record(success) if report else None
+
+def process_file_pair_captured(
+    svg_file, html_file, cache=None, with_report=False, profile=False, compact=False,
+    trace_memory=False
+):
+    """Process a file pair in a worker, capturing everything it prints"""
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        success, record = process_file_pair_reported(
+            svg_file, html_file, cache, with_report, profile, compact, trace_memory
+        )
+    return success, record, output.getvalue()
+
+def run_parallel(
+    pairs, workers, cache=None, with_report=False, profile=False, compact=False,
+    trace_memory=False
+):
+    """
+    Process file pairs in a process pool and return {svg_file: success}
+    and the report records of the floors
+    """
+
+    results = {}
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                process_file_pair_captured,
+                svg_file, html_file, cache, with_report, profile, compact, trace_memory
+            ): svg_file
+            for svg_file, html_file in pairs
+        }
+        for future in as_completed(futures):
+            svg_file = futures[future]
+            try:
+                success, record, output = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. out of memory)
+                success, record, output = False, None, f"Worker failed: {e}\n"
+            results[svg_file] = success
+            if record is not None:
+                records.append(record)
+            # Print each floor's output as one block so floors don't interleave
+            print(f"===== {svg_file} =====")
+            print(output, end="")
+    return results, records
+
+def print_summary(results):
+    """Print which floors succeeded and which failed"""
+
+    succeeded = sorted(f for f, success in results.items() if success)
+    failed = sorted(f for f, success in results.items() if not success)
+    print(f"\nSucceeded ({len(succeeded)}):")
+    for svg_file in succeeded:
+        print(f"  - {svg_file}")
+    print(f"Failed ({len(failed)}):")
+    for svg_file in failed:
+        print(f"  - {svg_file}")
+
+def pipeline_version():
+    """Hash of the pipeline source code, so code changes trigger rebuilds"""
+
+    digest = hashlib.sha256()
+    for path in PIPELINE_SOURCES:
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+def load_manifest():
+    """Load the build manifest, or an empty one if there is none yet"""
+
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest):
+    """Write the build manifest atomically"""
+
+    os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+    tmp_file = f"{MANIFEST_FILE}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def build_entry(svg_file, html_file, code_version, compact=False):
+    """Manifest entry describing the inputs and output of one floor"""
+
+    base_name = os.path.splitext(svg_file)[0]
+    return {
+        "svg_sha256": file_hash(os.path.join("svg_files", svg_file)),
+        "html_sha256": file_hash(os.path.join("html_files", html_file)),
+        "code_version": code_version,
+        "compact": compact,
+        "output": os.path.join("output_files", f"{base_name}.json"),
+    }
+
+def is_up_to_date(entry, previous):
+    """True if a floor was built from the same inputs and its output exists"""
+
+    return previous == entry and os.path.exists(entry["output"])
 
 def main():
     """Main pipeline function that processes all SVG and HTML file pairs"""
 
+    parser = argparse.ArgumentParser(description="Process all SVG and HTML file pairs")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of floors to process in parallel (default: 1, sequential)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="rebuild every floor, even if its inputs are unchanged"
+    )
+    parser.add_argument(
+        "--invalidate", action="append", default=[], metavar="FLOOR",
+        help="rebuild this floor (e.g. Ansys-1-map) even if unchanged; repeatable"
+    )
+    parser.add_argument(
+        "--cache-dir", metavar="DIR",
+        help="checkpoint each geometry stage here and reuse unchanged stages"
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=512,
+        help="evict least recently used checkpoints above this size (default: 512)"
+    )
+    parser.add_argument(
+        "--report", metavar="PATH",
+        help="append a JSON line per floor with each stage's time, memory and feature counts"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="also record each stage's peak Python allocations in the report "
+             "(slows stages unevenly, so don't compare their times)"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help=f"dump cProfile data of each floor to {PROFILE_DIR}"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="write quantized, delta-encoded floor files (decode with compact_floor.py)"
+    )
+    args = parser.parse_args()
+    if args.trace_memory and args.report is None:
+        parser.error("--trace-memory needs --report")
+
+    cache = None
+    if args.cache_dir:
+        cache = StageCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
     svg_files = []
     
     os.makedirs("svg_files", exist_ok=True)
@@ -128,15 +287,66 @@ def main():
     print(f"Found {len(svg_files)} SVG files and {len(html_files)} HTML files")
 
     # For each SVG file find a matching HTML file
+    pairs = []
     for svg_file in svg_files:
         base_name = os.path.splitext(svg_file)[0]
         html_file = f"{base_name}.html"
 
         if html_file in html_files:
-            process_file_pair(svg_file, html_file)
+            pairs.append((svg_file, html_file))
         else:
             print(f"No matching HTML file found for {svg_file}")
 
+    # Skip floors whose inputs and pipeline code are unchanged since last build
+    manifest = load_manifest()
+    code_version = pipeline_version()
+    entries = {}
+    to_build = []
+    skipped = []
+    for svg_file, html_file in pairs:
+        base_name = os.path.splitext(svg_file)[0]
+        entries[svg_file] = build_entry(svg_file, html_file, code_version, args.compact)
+        if (
+            args.force
+            or base_name in args.invalidate
+            or not is_up_to_date(entries[svg_file], manifest.get(base_name))
+        ):
+            to_build.append((svg_file, html_file))
+        else:
+            skipped.append(svg_file)
+    print(f"Skipping {len(skipped)} unchanged floors, building {len(to_build)}")
+
+    with_report = args.report is not None
+    if args.workers > 1:
+        results, records = run_parallel(
+            to_build, args.workers, cache, with_report, args.profile, args.compact,
+            args.trace_memory
+        )
+    else:
+        results = {}
+        records = []
+        for svg_file, html_file in to_build:
+            results[svg_file], record = process_file_pair_reported(
+                svg_file, html_file, cache, with_report, args.profile, args.compact,
+                args.trace_memory
+            )
+            if record is not None:
+                records.append(record)
+
+    if with_report:
+        append_report(args.report, records)
+        print(f"Run report appended to {args.report}")
+
+    # Only record floors that built successfully
+    for svg_file, success in results.items():
+        base_name = os.path.splitext(svg_file)[0]
+        if success:
+            manifest[base_name] = entries[svg_file]
+        else:
+            manifest.pop(base_name, None)
+    save_manifest(manifest)
+
+    print_summary(results)
     print(f"Pipeline completed.")
 
 if __name__ == "__main__":
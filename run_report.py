@@ -0,0 +1,133 @@
+# Per-floor stage timing and memory report for run_pipeline.
+# Each floor becomes one JSON line with the wall time, peak memory and
+# feature counts in and out of every stage it ran.
+#
+# Memory per stage:
+# - peak_rss_bytes: the process's peak resident memory during the stage,
+#   including what was already live. The high-water mark is reset before
+#   each stage, which needs Linux (/proc/self/clear_refs); null elsewhere.
+# - peak_traced_bytes: the peak Python and numpy allocations of the stage
+#   itself. tracemalloc slows some stages several times over (and not
+#   evenly), so this is only traced with trace_memory=True; null otherwise.
+# The process's lifetime high-water mark (ru_maxrss) is not recorded: it
+# carries over from earlier stages and floors, so it says nothing about one.
+
+import json
+import re
+import time
+import tracemalloc
+
+from svg_to_geojson_final import SvgFloor, FloorGeometry
+
+# Report name of each pipeline stage, by function name
+STAGE_NAMES = {
+    "read_svg": "svg_parse",
+    "load_svg": "flatten",
+    "simplify_geojson": "simplify",
+    "remove_duplicate_polygons": "dedup",
+    "remove_covered_polygons": "covered_removal",
+    "combine_overlapping_polygons": "overlap_merge",
+    "get_match_polygons": "matching",
+    "process_html_room_types": "html_join",
+    "process_geojson_to_json": "json_write",
+}
+
+
+def feature_count(value):
+    """Number of features in a stage's input or output, or None"""
+    if isinstance(value, SvgFloor):
+        return len(value.paths)
+    if isinstance(value, FloorGeometry):
+        return len(value)
+    if isinstance(value, dict) and "features" in value:
+        return len(value["features"])
+    return None
+
+
+def reset_peak_rss():
+    """Reset the process's resident high-water mark; False if unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    """Resident high-water mark since the last reset_peak_rss, or None"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            match = re.search(r"^VmHWM:\s+(\d+) kB", f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) * 1024 if match else None
+
+
+class FloorReport:
+    def __init__(self, floor, trace_memory=False):
+        self.floor = floor
+        self.stages = []
+        self.trace_memory = trace_memory
+        self.start = time.perf_counter()
+        # Peak memory is what Python and numpy allocate through tracemalloc;
+        # GEOS allocations only show up in the RSS figures
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def run(self, function, *args, name=None, **kwargs):
+        """Call function, recording its time, peak memory and counts"""
+        name = name or STAGE_NAMES.get(function.__name__, function.__name__)
+        # The features a stage works on are in its last countable argument,
+        # e.g. the floor in get_match_polygons(svg, floor)
+        counts = [feature_count(arg) for arg in args]
+        count_in = next((c for c in reversed(counts) if c is not None), None)
+
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_at_start = tracemalloc.get_traced_memory()[0]
+        rss_reset = reset_peak_rss()
+        start = time.perf_counter()
+        stage = {"stage": name}
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            stage["error"] = str(e)
+            raise
+        finally:
+            stage["seconds"] = round(time.perf_counter() - start, 6)
+            # Peak memory the stage allocated on top of what was already live
+            stage["peak_traced_bytes"] = (
+                tracemalloc.get_traced_memory()[1] - traced_at_start
+                if self.trace_memory
+                else None
+            )
+            stage["peak_rss_bytes"] = peak_rss_bytes() if rss_reset else None
+            stage["features_in"] = count_in
+            self.stages.append(stage)
+
+        stage["features_out"] = feature_count(result)
+        return result
+
+    def record(self, success):
+        """The floor's report line as a dict"""
+        return {
+            "floor": self.floor,
+            "success": success,
+            "seconds": round(time.perf_counter() - self.start, 6),
+            "stages": self.stages,
+        }
+
+
+def run_stage(report, function, *args, name=None, **kwargs):
+    """Call function, through report.run if there is a report"""
+    if report is None:
+        return function(*args, **kwargs)
+    return report.run(function, *args, name=name, **kwargs)
+
+
+def append_report(path, records):
+    """Append report records to a JSON lines file"""
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
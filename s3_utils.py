@@ -1,7 +1,30 @@
 from minio import Minio
+from minio.error import S3Error
+from minio.helpers import get_part_info
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 import os
 import json
+import hashlib
+import io
+import mimetypes
+import mmap
+import random
+import threading
+import time
+import urllib3
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Only needed for Content-Encoding br
+    brotli = None
+
+from json_stream import (
+    JsonStreamReader,
+    dump_stream,
+    iter_json_object,
+)
 
 load_dotenv()
 
@@ -18,17 +41,180 @@ client = Minio(
 
 bucket_name = "cmumaps"
 
+# Optional on-disk read-through cache for get_json_from_s3 and
+# get_generic_file_from_s3, enabled by setting S3_CACHE_DIR. Cached objects
+# are revalidated against the object's ETag and evicted least recently used
+# first above S3_CACHE_MAX_MB. With S3_OFFLINE=1 cached objects are served
+# without contacting S3; they are also served, with a warning, when S3 is
+# unreachable.
+s3_cache_dir = os.getenv("S3_CACHE_DIR")
+s3_cache_max_bytes = int(os.getenv("S3_CACHE_MAX_MB", "1024")) * 1024 * 1024
+s3_offline = os.getenv("S3_OFFLINE", "") not in ("", "0")
 
-def upload_json_file(local_file_path, s3_object_name):
-    """Upload a JSON file to S3 bucket"""
-    try:
-        # Upload the file
-        client.fput_object(
-            bucket_name,
-            s3_object_name,
-            local_file_path,
-            content_type="application/json",
+# Part size of multipart uploads whose length is not known up front, and of
+# in-memory uploads too large for a single PUT
+STREAM_PART_SIZE = 10 * 1024 * 1024
+
+# Attempts after the first for transient failures, with exponential backoff
+# starting at RETRY_BASE_DELAY seconds. The Minio client's urllib3 pool
+# already retries failed connections and 500/502/503/504 responses of
+# idempotent requests, so only what it can't retry is retried here
+TRANSIENT_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+
+# S3 error codes worth retrying (urllib3 passes these through when it does
+# not retry the request, e.g. a 503 SlowDown on a multipart POST)
+TRANSIENT_S3_CODES = {
+    "InternalError",
+    "RequestTimeout",
+    "SlowDown",
+    "ServiceUnavailable",
+}
+
+# Content-Encodings JSON uploads can be compressed with. Reads are decoded
+# by urllib3, which handles br only when the brotli package is installed
+COMPRESSIONS = ("gzip", "br")
+# zlib's default level; 9 is several times slower for a few percent on our
+# coordinate-heavy JSON
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 11
+
+# Bytes read from the source at a time when compressing an upload
+COMPRESS_READ_SIZE = 1024 * 1024
+
+# The client's connection pool holds 10 connections, so more upload
+# threads than this would open connections that are then thrown away
+MAX_TRANSFER_WORKERS = 10
+
+# Objects at least this large are downloaded as concurrent ranged GETs of
+# RANGE_CHUNK_SIZE bytes (a multiple of mmap.ALLOCATIONGRANULARITY, so each
+# chunk can be flushed to disk on its own)
+PARALLEL_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+RANGE_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def is_transient_error(e):
+    """True if an S3 call failed in a way that may succeed when retried"""
+    if isinstance(e, S3Error):
+        return e.code in TRANSIENT_S3_CODES
+    # A connection dropped or timed out while reading a response body, which
+    # urllib3 cannot retry; failures it did retry arrive as MaxRetryError
+    return isinstance(
+        e, (urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError)
+    )
+
+
+def retry_transient(function, *args, retries=TRANSIENT_RETRIES, **kwargs):
+    """Call function, retrying transient S3 failures with backoff and jitter"""
+    for attempt in range(retries + 1):
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_transient_error(e):
+                raise
+            delay = RETRY_BASE_DELAY * 2**attempt * (0.5 + random.random())
+            print(f"Retrying after {type(e).__name__}: {e} (in {delay:.1f}s)")
+            time.sleep(delay)
+
+
+class Compressor:
+    """compress(data) and finish() for one of COMPRESSIONS"""
+
+    def __init__(self, compression):
+        if compression == "gzip":
+            # A gzip container; zlib writes a zero mtime, so the same JSON
+            # always compresses to the same bytes (and ETag)
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.finish = compressor.compress, compressor.flush
+        elif compression == "br":
+            if brotli is None:
+                raise ValueError("br compression needs the brotli package")
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            raise ValueError(f"Unsupported compression {compression!r}")
+
+
+class CompressedReader(io.RawIOBase):
+    """Binary file-like object that reads source compressed as it goes"""
+
+    def __init__(self, source, compression):
+        self.source = source
+        self.compressor = Compressor(compression)
+        self.buffer = bytearray()
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self.buffer) < len(b) and not self.finished:
+            data = self.source.read(COMPRESS_READ_SIZE)
+            if data:
+                self.buffer += self.compressor.compress(data)
+            else:
+                self.buffer += self.compressor.finish()
+                self.finished = True
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        del self.buffer[:n]
+        return n
+
+
+def encoding_metadata(compression):
+    """put_object metadata that sets the Content-Encoding header, if any"""
+    return {"Content-Encoding": compression} if compression else None
+
+
+def check_content_encoding(headers, s3_object_name):
+    """Raise if urllib3 cannot decode an object's Content-Encoding"""
+    encoding = (headers or {}).get("Content-Encoding")
+    if encoding and encoding not in urllib3.response.HTTPResponse.CONTENT_DECODERS:
+        raise ValueError(
+            f"{s3_object_name} has Content-Encoding {encoding}; "
+            "install brotli to read it"
         )
+
+
+def get_decoded_object(s3_object_name):
+    """
+    get_object response for an object, checking it can be decoded; gzip
+    (and br, with brotli installed) objects are decoded as they are read
+    """
+    response = client.get_object(bucket_name, s3_object_name)
+    try:
+        check_content_encoding(response.headers, s3_object_name)
+    except ValueError:
+        response.close()
+        response.release_conn()
+        raise
+    return response
+
+
+def upload_json_file(local_file_path, s3_object_name, compression=None):
+    """Upload a JSON file to S3 bucket, compressed with compression if given"""
+    try:
+        if compression:
+            # Compress while uploading; the compressed length isn't known
+            # up front
+            with open(local_file_path, "rb") as f:
+                client.put_object(
+                    bucket_name,
+                    s3_object_name,
+                    CompressedReader(f, compression),
+                    length=-1,
+                    part_size=STREAM_PART_SIZE,
+                    content_type="application/json",
+                    metadata=encoding_metadata(compression),
+                )
+        else:
+            # Upload the file
+            client.fput_object(
+                bucket_name,
+                s3_object_name,
+                local_file_path,
+                content_type="application/json",
+            )
         print(f"Successfully uploaded {local_file_path} as {s3_object_name}")
         return True
     except Exception as e:
@@ -36,7 +222,54 @@ def upload_json_file(local_file_path, s3_object_name):
         return False
 
 
-def upload_folder(local_folder_path, s3_folder_name, file_type="octet-stream"):
+def upload_files(uploads, content_type, workers=1, retries=TRANSIENT_RETRIES):
+    """
+    Upload files to S3 bucket with a bounded thread pool sharing the client
+
+    Args:
+        uploads (list): (local_path, s3_object_name) pairs
+        content_type (str): Content type of every object
+        workers (int): Number of concurrent uploads (at most MAX_TRANSFER_WORKERS)
+        retries (int): Retries of each object after a transient failure
+
+    Returns:
+        dict: s3_object_name -> None if uploaded, else the error message
+    """
+
+    def upload(local_path, s3_object_name):
+        try:
+            retry_transient(
+                client.fput_object,
+                bucket_name,
+                s3_object_name,
+                local_path,
+                content_type=content_type,
+                retries=retries,
+            )
+            return None
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    workers = max(1, min(workers, MAX_TRANSFER_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            s3_object_name: executor.submit(upload, local_path, s3_object_name)
+            for local_path, s3_object_name in uploads
+        }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def print_transfer_report(results, action="Uploaded"):
+    """Print how many objects succeeded and the error of each failure"""
+    failures = {name: error for name, error in results.items() if error}
+    print(f"{action} {len(results) - len(failures)}/{len(results)} objects")
+    for name, error in sorted(failures.items()):
+        print(f"  - FAILED {name}: {error}")
+
+
+def upload_folder(
+    local_folder_path, s3_folder_name, file_type="octet-stream", workers=1
+):
     """
     Upload a folder to S3 bucket
 
@@ -44,25 +277,163 @@ def upload_folder(local_folder_path, s3_folder_name, file_type="octet-stream"):
         local_folder_path (str): The local object name/path
         s3_folder_name (str): The S3 object name/path
         file_type (str): the file type
+        workers (int): Number of concurrent uploads (default: 1, serial)
+
+    Returns:
+        bool: True if every file was uploaded; failures are reported per
+        object instead of stopping the upload
     """
     try:
         # Upload each of the files in the folder
+        uploads = []
         for filename in os.listdir(local_folder_path):
             local_path = os.path.join(local_folder_path, filename)
             if os.path.isdir(local_path):  # only upload files in the folder
                 continue
-            s3_object_name = f"{s3_folder_name}/{filename}"
-            client.fput_object(
-                bucket_name,
-                s3_object_name,
-                local_path,
-                content_type=f"application/{file_type}",
+            uploads.append((local_path, f"{s3_folder_name}/{filename}"))
+    except OSError as e:
+        print(f"Error uploading {local_folder_path}: {e}")
+        return False
+
+    results = upload_files(uploads, f"application/{file_type}", workers)
+    print_transfer_report(results)
+    if any(results.values()):
+        print(f"Error uploading {local_folder_path}: some files failed")
+        return False
+    print(f"Successfully uploaded {local_folder_path} as {s3_folder_name}")
+    return True
+
+
+def local_etag(local_path, size):
+    """
+    The ETag S3 would give local_path if uploaded by this client: the MD5
+    for a single part upload, else the MD5 of the part MD5s and the count
+    """
+    part_size, part_count = get_part_info(size, 0)
+    part_digests = []
+    with open(local_path, "rb") as f:
+        for _ in range(max(part_count, 1)):
+            digest = hashlib.md5()
+            remaining = part_size
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+            part_digests.append(digest)
+    if part_count <= 1:
+        return part_digests[0].hexdigest()
+    combined = hashlib.md5(b"".join(d.digest() for d in part_digests))
+    return f"{combined.hexdigest()}-{part_count}"
+
+
+def sync_folder(
+    local_folder_path,
+    s3_prefix,
+    delete=False,
+    dry_run=False,
+    workers=1,
+    allow_empty_delete=False,
+):
+    """
+    Make s3_prefix in the bucket match a local folder, uploading only new
+    or changed files
+
+    Args:
+        local_folder_path (str): The local folder, including subfolders
+        s3_prefix (str): The S3 "folder" to sync into
+        delete (bool): If True, delete remote objects with no local file
+        dry_run (bool): If True, only print what would be done
+        workers (int): Number of concurrent uploads
+        allow_empty_delete (bool): If True, delete=True may empty the whole
+            prefix when the local folder has no files (default: False)
+
+    Returns:
+        bool: True if everything planned was done (or dry_run), else False
+    """
+    # os.walk yields nothing for a missing folder, which would make every
+    # remote object look deleted
+    if not os.path.isdir(local_folder_path):
+        print(f"Error: {local_folder_path} is not a folder")
+        return False
+
+    prefix = s3_prefix.rstrip("/") + "/"
+    try:
+        # List the remote prefix once
+        remote = {
+            obj.object_name: (obj.size, (obj.etag or "").strip('"'))
+            for obj in retry_transient(
+                lambda: list(
+                    client.list_objects(bucket_name, prefix=prefix, recursive=True)
+                )
             )
-        print(f"Successfully uploaded {local_folder_path} as {s3_folder_name}")
-        return True
+            if not obj.is_dir
+        }
     except Exception as e:
-        print(f"Error uploading {local_folder_path}: {e}")
+        print(f"Error listing {prefix}: {e}")
+        return False
+
+    uploads = []
+    unchanged = 0
+    local_names = set()
+    for root, _, files in os.walk(local_folder_path):
+        for filename in sorted(files):
+            local_path = os.path.join(root, filename)
+            relative = os.path.relpath(local_path, local_folder_path)
+            s3_object_name = prefix + relative.replace(os.sep, "/")
+            local_names.add(s3_object_name)
+
+            size = os.path.getsize(local_path)
+            if s3_object_name not in remote:
+                uploads.append((local_path, s3_object_name, "new"))
+            elif remote[s3_object_name][0] != size:
+                uploads.append((local_path, s3_object_name, "size changed"))
+            # Only hash files whose size matches
+            elif remote[s3_object_name][1] != local_etag(local_path, size):
+                uploads.append((local_path, s3_object_name, "content changed"))
+            else:
+                unchanged += 1
+    if delete and not local_names and remote and not allow_empty_delete:
+        print(
+            f"Error: {local_folder_path} has no files; refusing to delete all of "
+            f"{prefix} (pass allow_empty_delete=True to do so)"
+        )
         return False
+    orphans = sorted(set(remote) - local_names) if delete else []
+
+    print(
+        f"Sync {local_folder_path} -> {prefix}: {len(uploads)} to upload, "
+        f"{len(orphans)} to delete, {unchanged} unchanged"
+    )
+    for _, s3_object_name, reason in uploads:
+        print(f"  upload {s3_object_name} ({reason})")
+    for s3_object_name in orphans:
+        print(f"  delete {s3_object_name}")
+    if dry_run:
+        return True
+
+    # Upload each content type as one batch
+    by_type = {}
+    for local_path, s3_object_name, _ in uploads:
+        content_type = mimetypes.guess_type(local_path)[0] or "application/octet-stream"
+        by_type.setdefault(content_type, []).append((local_path, s3_object_name))
+    results = {}
+    for content_type, batch in by_type.items():
+        results.update(upload_files(batch, content_type, workers))
+
+    deleted = {}
+    for s3_object_name in orphans:
+        try:
+            retry_transient(client.remove_object, bucket_name, s3_object_name)
+            deleted[s3_object_name] = None
+        except Exception as e:
+            deleted[s3_object_name] = f"{type(e).__name__}: {e}"
+
+    print_transfer_report(results)
+    if orphans:
+        print_transfer_report(deleted, action="Deleted")
+    return not any(results.values()) and not any(deleted.values())
 
 
 def upload_generic_file(local_file_path, s3_object_name, file_type="octet-stream"):
@@ -89,33 +460,52 @@ def upload_generic_file(local_file_path, s3_object_name, file_type="octet-stream
 
 def save_upload_json_file(
     s3_object_name: str,
-    json_data: dict | list,
+    json_data,
     local_file_path: str = None,
     indent: int = 2,
     ensure_ascii: bool = False,
     cleanup_local: bool = False,
+    in_memory: bool = False,
+    compression: str = None,
 ) -> bool:
     """
-    Save JSON data to a local file and upload it to S3 bucket
+    Save JSON data to a local file and upload it to S3 bucket, or with
+    in_memory=True upload it straight from memory without touching disk
 
     Args:
         s3_object_name (str): The object name/path in S3 bucket
-        json_data (dict | list): The JSON data to save and upload
+        json_data: The JSON data to save and upload; a dict, a list, or a
+            json_stream JsonObjectStream/JsonArrayStream written one record
+            at a time
         local_file_path (str, optional): Local file path. If None, uses s3_object_name
         indent (int): Number of spaces for JSON indentation (default: 2)
         ensure_ascii (bool): If True, escape non-ASCII characters (default: False)
         cleanup_local (bool): If True, delete local file after successful upload (default: False)
+        in_memory (bool): If True, upload from memory without a local file,
+            piping payloads larger than one part into a multipart upload;
+            local_file_path and cleanup_local are ignored (default: False)
+        compression (str, optional): "gzip" or "br" to upload compressed with
+            that Content-Encoding; the local file stays uncompressed
 
     Returns:
         bool: True if successful, False otherwise
     """
+    if in_memory:
+        return upload_json_buffer(
+            json_data,
+            s3_object_name,
+            indent=indent,
+            ensure_ascii=ensure_ascii,
+            compression=compression,
+        )
+
     # Use s3_object_name as local path if not specified
     local_path = local_file_path if local_file_path else s3_object_name
 
     try:
         # Save JSON data to local file with proper formatting
         with open(local_path, "w", encoding="utf-8") as f:
-            json.dump(json_data, f, indent=indent, ensure_ascii=ensure_ascii)
+            dump_stream(json_data, f, indent=indent, ensure_ascii=ensure_ascii)
         print(f"Successfully saved JSON data to {local_path}")
 
     except (IOError, OSError) as e:
@@ -127,7 +517,7 @@ def save_upload_json_file(
 
     try:
         # Upload the file to S3
-        success = upload_json_file(local_path, s3_object_name)
+        success = upload_json_file(local_path, s3_object_name, compression)
 
         if success and cleanup_local and local_path != s3_object_name:
             # Clean up local file if requested and it's not the same as S3 name
@@ -144,6 +534,424 @@ def save_upload_json_file(
         return False
 
 
+def json_reader(json_data, indent=2, ensure_ascii=False, compression=None):
+    """
+    Binary file-like object reading the JSON of json_data (compressed, if
+    compression is given) as it is encoded
+    """
+    reader = JsonStreamReader(json_data, indent=indent, ensure_ascii=ensure_ascii)
+    return CompressedReader(reader, compression) if compression else reader
+
+
+class PrefixedReader(io.RawIOBase):
+    """Binary file-like object that reads prefix, then the rest of source"""
+
+    def __init__(self, prefix, source):
+        self.prefix = memoryview(prefix)
+        self.source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self.prefix:
+            return self.source.readinto(b)
+        n = min(len(b), len(self.prefix))
+        b[:n] = self.prefix[:n]
+        self.prefix = self.prefix[n:]
+        return n
+
+
+def encode_json_buffer(json_data, indent=2, ensure_ascii=False, compression=None):
+    """
+    JSON of json_data encoded (and compressed, if compression is given) into
+    an in-memory buffer one chunk at a time
+    """
+    return io.BytesIO(json_reader(json_data, indent, ensure_ascii, compression).read())
+
+
+def upload_json_buffer(
+    json_data, s3_object_name, indent=2, ensure_ascii=False, compression=None
+):
+    """
+    Upload JSON data to S3 straight from memory, so nothing is written to
+    disk. A payload of up to STREAM_PART_SIZE is encoded into a buffer and
+    sent with its known length; a larger one is piped into a multipart
+    upload as it is encoded, so at most about one part is held at a time.
+    """
+    try:
+        reader = json_reader(json_data, indent, ensure_ascii, compression)
+        # Encode one byte past a part to tell which case this is
+        head = reader.read(STREAM_PART_SIZE + 1)
+    except (TypeError, ValueError) as e:
+        print(f"Error encoding JSON data: {e}")
+        return False
+
+    if len(head) > STREAM_PART_SIZE:
+        try:
+            # Not retried: the rest of the payload is encoded while uploading
+            client.put_object(
+                bucket_name,
+                s3_object_name,
+                PrefixedReader(head, reader),
+                length=-1,
+                part_size=STREAM_PART_SIZE,
+                content_type="application/json",
+                metadata=encoding_metadata(compression),
+            )
+            print(f"Successfully uploaded JSON stream as {s3_object_name}")
+            return True
+        except Exception as e:
+            print(f"Error uploading JSON as {s3_object_name}: {e}")
+            return False
+
+    buffer = io.BytesIO(head)
+    length = len(head)
+
+    def put():
+        # Rewind so a retried upload sends the payload from the start
+        buffer.seek(0)
+        client.put_object(
+            bucket_name,
+            s3_object_name,
+            buffer,
+            length=length,
+            part_size=STREAM_PART_SIZE,
+            content_type="application/json",
+            metadata=encoding_metadata(compression),
+        )
+
+    try:
+        retry_transient(put)
+        print(f"Successfully uploaded {length} bytes of JSON as {s3_object_name}")
+        return True
+    except Exception as e:
+        print(f"Error uploading JSON as {s3_object_name}: {e}")
+        return False
+
+
+def upload_json_stream(
+    json_data, s3_object_name, indent=None, ensure_ascii=False, compression=None
+):
+    """
+    Upload JSON data to S3 as it is encoded, without a local file. json_data
+    may hold json_stream streams, so records are produced while uploading.
+    """
+    try:
+        client.put_object(
+            bucket_name,
+            s3_object_name,
+            json_reader(json_data, indent, ensure_ascii, compression),
+            length=-1,
+            part_size=STREAM_PART_SIZE,
+            content_type="application/json",
+            metadata=encoding_metadata(compression),
+        )
+        print(f"Successfully uploaded JSON stream as {s3_object_name}")
+        return True
+    except Exception as e:
+        print(f"Error uploading JSON stream as {s3_object_name}: {e}")
+        return False
+
+
+def cache_paths(s3_object_name):
+    """Data and metadata file of an object in the S3 cache"""
+    key = hashlib.sha256(s3_object_name.encode()).hexdigest()
+    base = os.path.join(s3_cache_dir, key)
+    return base + ".data", base + ".json"
+
+
+def read_cache_etag(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)["etag"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_cache_meta(meta_path, s3_object_name, etag):
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"object_name": s3_object_name, "etag": etag}, f)
+
+
+def is_unreachable_error(e):
+    """True if S3 could not be reached at all (as opposed to answering)"""
+    return isinstance(
+        e, (urllib3.exceptions.HTTPError, ConnectionError, TimeoutError)
+    ) and not isinstance(e, S3Error)
+
+
+def evict_s3_cache():
+    """Delete least recently used cached objects until under the size limit"""
+    entries = []
+    for name in os.listdir(s3_cache_dir):
+        if not name.endswith(".data"):
+            continue
+        path = os.path.join(s3_cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= s3_cache_max_bytes:
+            break
+        for stale in (path, path[: -len(".data")] + ".json"):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+def cached_object_path(s3_object_name):
+    """
+    Local path of an up-to-date copy of an object, downloading it only if
+    the cached copy is missing or its ETag no longer matches
+    """
+    os.makedirs(s3_cache_dir, exist_ok=True)
+    data_path, meta_path = cache_paths(s3_object_name)
+    cached_etag = read_cache_etag(meta_path) if os.path.exists(data_path) else None
+
+    if s3_offline:
+        if cached_etag is None:
+            raise FileNotFoundError(f"{s3_object_name} is not cached (S3_OFFLINE)")
+        print(f"Offline: using cached {s3_object_name}")
+        os.utime(data_path)
+        return data_path
+
+    try:
+        # With a cached copy to fall back on, don't add retries on top of
+        # urllib3's connection retries
+        stat = retry_transient(
+            client.stat_object,
+            bucket_name,
+            s3_object_name,
+            retries=0 if cached_etag is not None else TRANSIENT_RETRIES,
+        )
+    except Exception as e:
+        if cached_etag is not None and is_unreachable_error(e):
+            print(f"S3 unreachable ({e}); using possibly stale cached {s3_object_name}")
+            os.utime(data_path)
+            return data_path
+        raise
+    etag = (stat.etag or "").strip('"')
+
+    if cached_etag == etag:
+        print(f"Using cached {s3_object_name} (ETag matches)")
+        os.utime(data_path)
+        return data_path
+
+    if use_ranged_download(stat):
+        # Large objects come down in concurrent chunks, resuming any chunks
+        # an interrupted download already fetched
+        download_ranged(s3_object_name, data_path, stat)
+        write_cache_meta(meta_path, s3_object_name, etag)
+        evict_s3_cache()
+        return data_path
+
+    # Download to a temporary file so a failure never leaves a partial copy.
+    # Compressed objects are cached decoded
+    response = retry_transient(get_decoded_object, s3_object_name)
+    tmp_path = f"{data_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in response.stream(1 << 20):
+                f.write(chunk)
+        # The ETag of what was actually downloaded, in case it just changed
+        etag = (response.headers.get("ETag") or etag).strip('"')
+    finally:
+        response.close()
+        response.release_conn()
+    os.replace(tmp_path, data_path)
+    write_cache_meta(meta_path, s3_object_name, etag)
+    evict_s3_cache()
+    return data_path
+
+
+def use_ranged_download(stat):
+    """True if an object should be downloaded as concurrent ranged GETs"""
+    # Ranges of a compressed object are slices of the compressed bytes,
+    # which can't be decoded on their own
+    encoding = (stat.metadata or {}).get("Content-Encoding")
+    return stat.size >= PARALLEL_DOWNLOAD_THRESHOLD and not encoding
+
+
+def chunk_ranges(size, chunk_size=RANGE_CHUNK_SIZE):
+    """(offset, length) of each chunk of an object of the given size"""
+    return [
+        (offset, min(chunk_size, size - offset))
+        for offset in range(0, size, chunk_size)
+    ]
+
+
+def fetch_range(s3_object_name, etag, offset, length, buffer):
+    """GET one byte range of an object into buffer at the same offset"""
+    # If-Match fails the request if the object changed since the first
+    # chunk, so chunks of different versions are never mixed
+    response = client.get_object(
+        bucket_name,
+        s3_object_name,
+        offset=offset,
+        length=length,
+        request_headers={"If-Match": f'"{etag}"'},
+    )
+    position = offset
+    try:
+        for data in response.stream(1 << 20):
+            buffer[position : position + len(data)] = data
+            position += len(data)
+    finally:
+        response.close()
+        response.release_conn()
+    if position != offset + length:
+        # A cut off response; retried like any other dropped connection
+        raise urllib3.exceptions.ProtocolError(
+            f"Got {position - offset} of {length} bytes at offset {offset}"
+        )
+
+
+def fetch_ranges(s3_object_name, etag, ranges, buffer, workers, on_done=None):
+    """
+    Fetch ranges of an object into buffer with a bounded thread pool, calling
+    on_done(offset, length) after each one. Raises the first failure once
+    the other chunks are finished, so they are not fetched again on resume.
+    """
+
+    def fetch(offset, length):
+        retry_transient(fetch_range, s3_object_name, etag, offset, length, buffer)
+        if on_done:
+            on_done(offset, length)
+
+    workers = max(1, min(workers, MAX_TRANSFER_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch, offset, length) for offset, length in ranges]
+    for future in futures:
+        future.result()
+
+
+def download_ranged(
+    s3_object_name,
+    local_file_path,
+    stat=None,
+    workers=MAX_TRANSFER_WORKERS,
+    chunk_size=RANGE_CHUNK_SIZE,
+):
+    """
+    Download an object to local_file_path as concurrent ranged GETs written
+    into a memory-mapped file. The file is assembled as local_file_path.part
+    with a .part.json sidecar listing the finished chunks, so a download that
+    is interrupted resumes with only the missing chunks of the same version.
+    Raises on failure, leaving the partial download for the next attempt.
+    chunk_size is rounded up to a multiple of mmap.ALLOCATIONGRANULARITY,
+    which mmap.flush needs for a chunk's offset.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, not {chunk_size}")
+    granularity = mmap.ALLOCATIONGRANULARITY
+    chunk_size = -(-chunk_size // granularity) * granularity
+
+    if stat is None:
+        stat = retry_transient(client.stat_object, bucket_name, s3_object_name)
+    etag = (stat.etag or "").strip('"')
+    size = stat.size
+    part_path = f"{local_file_path}.part"
+    progress_path = f"{part_path}.json"
+    progress = {
+        "object_name": s3_object_name,
+        "etag": etag,
+        "size": size,
+        "chunk_size": chunk_size,
+        "done": [],
+    }
+
+    def save_progress():
+        tmp_path = f"{progress_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, progress_path)
+
+    try:
+        with open(progress_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    same_download = all(
+        saved.get(key) == progress[key]
+        for key in ("object_name", "etag", "size", "chunk_size")
+    )
+    if (
+        same_download
+        and os.path.exists(part_path)
+        and os.path.getsize(part_path) == size
+    ):
+        progress["done"] = saved["done"]
+        print(
+            f"Resuming {s3_object_name}: "
+            f"{len(progress['done'])} chunks already downloaded"
+        )
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(local_file_path)), exist_ok=True)
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        save_progress()
+
+    done = set(progress["done"])
+    ranges = [r for r in chunk_ranges(size, chunk_size) if r[0] not in done]
+    lock = threading.Lock()
+    with open(part_path, "r+b") as f:
+        # mmap can't map an empty file; there is nothing to fetch then
+        buffer = mmap.mmap(f.fileno(), size) if size else None
+
+        def on_done(offset, length):
+            # Only a chunk that is on disk may be recorded as done
+            buffer.flush(offset, length)
+            with lock:
+                progress["done"].append(offset)
+                save_progress()
+
+        try:
+            fetch_ranges(s3_object_name, etag, ranges, buffer, workers, on_done)
+        finally:
+            if buffer is not None:
+                buffer.close()
+
+    os.replace(part_path, local_file_path)
+    os.remove(progress_path)
+    print(
+        f"Downloaded {s3_object_name} in {len(chunk_ranges(size, chunk_size))} chunks"
+    )
+    return stat
+
+
+def get_ranged_buffer(s3_object_name, stat=None, workers=MAX_TRANSFER_WORKERS):
+    """
+    An object's content in an anonymous memory map, fetched as concurrent
+    ranged GETs without touching disk. The map reads like a file (read,
+    seek, close) and also supports slicing.
+    """
+    if stat is None:
+        stat = retry_transient(client.stat_object, bucket_name, s3_object_name)
+    if stat.size == 0:
+        # mmap can't map zero bytes
+        return io.BytesIO()
+    buffer = mmap.mmap(-1, stat.size)
+    try:
+        fetch_ranges(
+            s3_object_name,
+            (stat.etag or "").strip('"'),
+            chunk_ranges(stat.size),
+            buffer,
+            workers,
+        )
+    except Exception:
+        buffer.close()
+        raise
+    return buffer
+
+
 def list_bucket_objects():
     """List all objects in the bucket"""
     try:
@@ -156,10 +964,24 @@ def list_bucket_objects():
 
 
 def download_json_file(s3_object_name, local_file_path):
-    """Download a JSON file from S3 bucket"""
+    """
+    Download a JSON file from S3 bucket, decoded if it was compressed. Large
+    objects are downloaded in concurrent chunks and resume if interrupted.
+    """
     try:
+        stat = client.stat_object(bucket_name, s3_object_name)
+        if use_ranged_download(stat):
+            download_ranged(s3_object_name, local_file_path, stat)
+            print(f"Successfully downloaded {s3_object_name} to {local_file_path}")
+            return True
+
         # Download the file
-        client.fget_object(bucket_name, s3_object_name, local_file_path)
+        stat = client.fget_object(bucket_name, s3_object_name, local_file_path)
+        try:
+            check_content_encoding(stat.metadata, s3_object_name)
+        except ValueError:
+            os.remove(local_file_path)
+            raise
         print(f"Successfully downloaded {s3_object_name} to {local_file_path}")
         return True
     except Exception as e:
@@ -180,8 +1002,20 @@ def get_json_from_s3(s3_object_name, return_data=False):
         dict/list: JSON data if return_data=True, otherwise response object
     """
     try:
+        if s3_cache_dir:
+            # Read through the local cache; a cached file stands in for the
+            # raw response object
+            data_path = cached_object_path(s3_object_name)
+            if not return_data:
+                print(f"Successfully retrieved object {s3_object_name}")
+                return open(data_path, "rb")
+            with open(data_path, "rb") as f:
+                json_data = json.loads(f.read().decode("utf-8"))
+            print(f"Successfully retrieved JSON data from {s3_object_name}")
+            return json_data
+
         # Get the object
-        response = client.get_object(bucket_name, s3_object_name)
+        response = get_decoded_object(s3_object_name)
 
         if return_data:
             # Read and parse JSON data
@@ -198,6 +1032,35 @@ def get_json_from_s3(s3_object_name, return_data=False):
         return None
 
 
+def iter_json_from_s3(s3_object_name, predicate=None):
+    """
+    Yield the top-level (key, value) pairs of a JSON object in S3 one at a
+    time, decoding straight from the response (or the cached file), so the
+    whole object is never in memory
+
+    Args:
+        s3_object_name (str): The S3 object name/path
+        predicate (callable): If given, only yield pairs for which
+                              predicate(key, value) is true
+    """
+    try:
+        if s3_cache_dir:
+            source = open(cached_object_path(s3_object_name), "rb")
+        else:
+            source = get_decoded_object(s3_object_name)
+    except Exception as e:
+        print(f"Error getting {s3_object_name}: {e}")
+        raise
+
+    try:
+        yield from iter_json_object(source, predicate)
+        print(f"Successfully streamed JSON data from {s3_object_name}")
+    finally:
+        source.close()
+        if hasattr(source, "release_conn"):
+            source.release_conn()
+
+
 def get_generic_file_from_s3(s3_object_name):
     """
     Get generic data from S3 bucket
@@ -208,11 +1071,23 @@ def get_generic_file_from_s3(s3_object_name):
                            If False, return the raw response object
 
     Returns:
-        response object
+        response object (an open cached file if S3_CACHE_DIR is set, or for
+        large objects a memory map filled by concurrent ranged GETs)
     """
     try:
+        if s3_cache_dir:
+            data_path = cached_object_path(s3_object_name)
+            print(f"Successfully retrieved object {s3_object_name}")
+            return open(data_path, "rb")
+
+        stat = client.stat_object(bucket_name, s3_object_name)
+        if use_ranged_download(stat):
+            buffer = get_ranged_buffer(s3_object_name, stat)
+            print(f"Successfully retrieved object {s3_object_name}")
+            return buffer
+
         # Get the object
-        response = client.get_object(bucket_name, s3_object_name)
+        response = get_decoded_object(s3_object_name)
         print(f"Successfully retrieved object {s3_object_name}")
         return response
 
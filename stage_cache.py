@@ -0,0 +1,221 @@
+# On-disk checkpoint cache for the SVG geometry stages of the pipeline.
+# Each stage's FloorGeometry is stored as WKB plus JSON properties in a
+# compressed .npz file, keyed by the SVG's hash, the parameters and source
+# of that stage (including the svg_to_geojson_final helpers and classes it
+# uses) and the keys of every earlier stage. Changing a late stage (e.g.
+# combine_overlapping_polygons) reuses the checkpoints before it.
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import shapely
+
+import svg_to_geojson_final as geometry
+from svg_to_geojson_final import FloorGeometry
+from run_report import run_stage
+
+# Cache size above which the least recently used checkpoints are deleted
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CHECKPOINT_SUFFIX = ".npz"
+
+
+def stage_params():
+    """Each geometry stage with the module parameters its output depends on"""
+    # Read the constants at call time so tuning them changes the cache keys
+    return [
+        (
+            geometry.load_svg,
+            {
+                "tolerance": geometry.FLATTEN_TOLERANCE,
+                "initial_pieces": geometry.FLATTEN_INITIAL_PIECES,
+                "max_depth": geometry.FLATTEN_MAX_DEPTH,
+                "precision": geometry.GEOJSON_PRECISION,
+            },
+        ),
+        (geometry.simplify_geojson, {"tol": geometry.COLINEAR_TOLERANCE}),
+        (geometry.remove_duplicate_polygons, {"precision": geometry.DEDUP_PRECISION}),
+        (geometry.remove_covered_polygons, {}),
+        (geometry.combine_overlapping_polygons, {}),
+    ]
+
+
+def file_hash(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_names(code):
+    """Global names used by a code object and the functions nested in it"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= code_names(const)
+    return names
+
+
+def stage_sources(stage):
+    """
+    Source of a stage and of every function and class of its module that it
+    uses, directly or through other helpers, in a stable order
+    """
+    module = stage.__module__
+    seen = {}
+    pending = [stage]
+    while pending:
+        obj = pending.pop()
+        if obj.__name__ in seen:
+            continue
+        seen[obj.__name__] = inspect.getsource(obj)
+        if inspect.isclass(obj):
+            functions = [f for f in vars(obj).values() if inspect.isfunction(f)]
+        else:
+            functions = [obj]
+        for function in functions:
+            for name in code_names(function.__code__):
+                value = function.__globals__.get(name)
+                if (
+                    inspect.isfunction(value) or inspect.isclass(value)
+                ) and value.__module__ == module:
+                    pending.append(value)
+    return [seen[name] for name in sorted(seen)]
+
+
+def stage_key(parent_key, stage, params):
+    """Key of a stage's output given the key of its input"""
+    digest = hashlib.sha256()
+    digest.update(parent_key.encode())
+    digest.update(stage.__name__.encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    for source in stage_sources(stage):
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + CHECKPOINT_SUFFIX)
+
+    def load(self, key):
+        """Return the checkpointed FloorGeometry for key, or None"""
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                offsets = data["offsets"]
+                blob = data["wkb"].tobytes()
+                properties = json.loads(data["properties"].tobytes())
+        except (FileNotFoundError, OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+        wkb = [blob[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        geometries = shapely.from_wkb(np.array(wkb, dtype=object))
+        if len(geometries) == 0:
+            geometries = np.empty(0, dtype=object)
+
+        # Mark the checkpoint as recently used for eviction; another worker
+        # may have evicted it since it was read, which is fine
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return FloorGeometry(geometries, properties)
+
+    def save(self, key, floor):
+        """Checkpoint a FloorGeometry under key, then evict if over size"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        wkb = shapely.to_wkb(floor.geometries) if len(floor) else []
+        offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in wkb])
+        properties = json.dumps(floor.properties).encode()
+
+        # Write to a temporary file so a crash never leaves a partial checkpoint
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                offsets=offsets,
+                wkb=np.frombuffer(b"".join(wkb), dtype=np.uint8),
+                properties=np.frombuffer(properties, dtype=np.uint8),
+            )
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used checkpoints until under max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CHECKPOINT_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def load_latest_checkpoint(cache, keys):
+    """Index of the latest stage with a checkpoint and its floor, or (-1, None)"""
+    for i in reversed(range(len(keys))):
+        floor = cache.load(keys[i])
+        if floor is not None:
+            return i, floor
+    return -1, None
+
+
+def run_geometry_stages(svg_file_path, svg, cache=None, report=None):
+    """
+    Run load_svg through combine_overlapping_polygons on an SvgFloor read
+    from svg_file_path, resuming from the latest checkpoint if cache is set.
+    Each stage is recorded in report, a FloorReport, if one is given.
+    """
+    stages = stage_params()
+    if cache is None:
+        floor = svg
+        for stage, _ in stages:
+            floor = run_stage(report, stage, floor)
+        return floor
+
+    keys = []
+    key = file_hash(svg_file_path)
+    for stage, params in stages:
+        key = stage_key(key, stage, params)
+        keys.append(key)
+
+    # Resume after the latest stage that has a checkpoint
+    latest, floor = run_stage(
+        report, load_latest_checkpoint, cache, keys, name="checkpoint_load"
+    )
+    if floor is None:
+        floor = svg
+    else:
+        print(f"Loaded {stages[latest][0].__name__} checkpoint")
+
+    for (stage, _), key in zip(stages[latest + 1 :], keys[latest + 1 :]):
+        floor = run_stage(report, stage, floor)
+        cache.save(key, floor)
+
+    return floor
@@ -4,14 +4,17 @@
 # then it uses simplify_geojson.py to simplify the geojson file.
 # then it uses remove_duplicate_polygon.py to remove the duplicate polygon.
 
-from bs4 import BeautifulSoup
-from svgpathtools import parse_path
+from svgpathtools import parse_path, Line
 import geojson
+import numpy as np
+import shapely
 from shapely.geometry import shape, mapping
 import xml.etree.ElementTree as ET
-from shapely.geometry import Point, Polygon, MultiPolygon
-from shapely.ops import nearest_points, unary_union
+from shapely.geometry import MultiPolygon
+from shapely.ops import unary_union
+from shapely.strtree import STRtree
 import os
+from itertools import chain
 
 
 class Room:
@@ -21,36 +24,167 @@ class Room:
 
 
 class Poly:
-    def __init__(self, id, coordinates):
+    def __init__(self, id, geometry):
         self.id = id
-        self.coordinates = coordinates
+        self.geometry = geometry
 
+    @property
+    def coordinates(self):
+        return list(self.geometry.exterior.coords)
 
-def svg_path_to_coords(svg_d, num_points=100):
-    path = parse_path(svg_d)
-    coords = []
-    for seg in path:
-        # Sample points along each segment
-        for i in range(num_points + 1):
-            pt = seg.point(i / num_points)
-            coords.append((pt.real, pt.imag))
-    return coords
 
+class SvgFloor:
+    def __init__(self, paths, room_tags):
+        # d attribute of every <path>, in document order (None if missing)
+        self.paths = paths
+        self.room_tags = room_tags
+
+
+class FloorGeometry:
+    def __init__(self, geometries, properties):
+        # Array of Shapely polygons and the properties dict of each, in order
+        self.geometries = geometries
+        self.properties = properties
+
+    def __len__(self):
+        return len(self.geometries)
+
+
+def to_geojson(floor):
+    """Convert a FloorGeometry to a GeoJSON FeatureCollection"""
+    # geojson.Polygon applies the library's default coordinate precision
+    features = [
+        geojson.Feature(
+            geometry=geojson.Polygon(mapping(geometry)["coordinates"]),
+            properties=properties,
+        )
+        for geometry, properties in zip(floor.geometries, floor.properties)
+    ]
+    return geojson.FeatureCollection(features)
+
+
+def from_geojson(geojson_data):
+    """Convert a GeoJSON FeatureCollection of polygons to a FloorGeometry"""
+    features = geojson_data["features"]
+    geometries = np.array([shape(f["geometry"]) for f in features], dtype=object)
+    return FloorGeometry(geometries, [dict(f["properties"]) for f in features])
+
+
+def polygons_from_rings(coords, ring_ids):
+    """
+    Build one polygon per ring from concatenated ring coordinates.
+    ring_ids must run from 0 to the number of rings - 1 in order.
+    """
+    if len(coords) == 0:
+        return np.empty(0, dtype=object)
+    return shapely.polygons(shapely.linearrings(coords, indices=ring_ids))
+
+
+def exterior_coordinates(geometries):
+    """Concatenated exterior ring coordinates and the polygon of each point"""
+    if len(geometries) == 0:
+        return np.empty((0, 2)), np.empty(0, dtype=np.intp)
+    rings = shapely.get_exterior_ring(geometries)
+    return shapely.get_coordinates(rings, return_index=True)
+
+
+SVG_TEXT_TAG = "{http://www.w3.org/2000/svg}text"
+
+# Decimal places geojson.Polygon rounds coordinates to
+GEOJSON_PRECISION = 6
+
+# Maximum distance (in SVG units) between a curve and its flattened chords
+FLATTEN_TOLERANCE = 0.01
+# Each curve is first split into this many pieces so S-bends and closed arcs
+# are not mistaken for straight chords
+FLATTEN_INITIAL_PIECES = 4
+FLATTEN_MAX_DEPTH = 16
+
+
+def chord_error(p0, p1, p):
+    """Distance from point p to the chord p0 -> p1 (all complex numbers)."""
+    chord = p1 - p0
+    if chord == 0:
+        return abs(p - p0)
+    return abs(((p - p0) * chord.conjugate()).imag) / abs(chord)
+
+
+def flatten_segment(seg, tolerance=FLATTEN_TOLERANCE):
+    """
+    Return the points of seg after its start point.
+    Lines only need their end point; curves are subdivided adaptively
+    until every chord is within tolerance of the curve.
+    """
+    if isinstance(seg, Line):
+        return [seg.end]
+
+    points = []
+
+    def subdivide(t0, p0, t1, p1, depth):
+        tm = (t0 + t1) / 2
+        pm = seg.point(tm)
+        if depth < FLATTEN_MAX_DEPTH and chord_error(p0, p1, pm) > tolerance:
+            subdivide(t0, p0, tm, pm, depth + 1)
+            subdivide(tm, pm, t1, p1, depth + 1)
+        else:
+            points.append(p1)
 
-def load_svg(file_name):
-    with open(file_name, "r") as f:
-        soup = BeautifulSoup(f, "xml")
+    ts = [i / FLATTEN_INITIAL_PIECES for i in range(FLATTEN_INITIAL_PIECES + 1)]
+    for t0, t1 in zip(ts, ts[1:]):
+        subdivide(t0, seg.point(t0), t1, seg.point(t1), 0)
+    return points
 
-    # Extract all <path> elements
-    paths = soup.find_all("path")
 
-    features = []
+def svg_path_to_coords(svg_d, tolerance=FLATTEN_TOLERANCE):
+    path = parse_path(svg_d)
+    points = []
+    for seg in path:
+        # Only repeat the start point when the path jumps (e.g. a new subpath)
+        if not points or points[-1] != seg.start:
+            points.append(seg.start)
+        points.extend(flatten_segment(seg, tolerance))
+    return [(pt.real, pt.imag) for pt in points]
+
 
-    for i, path in enumerate(paths):
-        d = path.get("d")
+def read_svg(file_name):
+    """
+    Read the <path> d strings and the room labels of an SVG in one
+    streaming pass, clearing each element once it has been handled.
+    """
+    path_ds = []
+    seen = set()
+    room_tags = []
+    for _, elem in ET.iterparse(file_name, events=("end",)):
+        tag = elem.tag.rpartition("}")[2]
+        if tag == "path":
+            path_ds.append(elem.get("d"))
+        elif elem.tag == SVG_TEXT_TAG:
+            # Extract the room name from the text content
+            room_name = elem.text.strip() if elem.text else ""
+            # Extract the coordinates from the attributes
+            x_attr = elem.get("x")
+            y_attr = elem.get("y")
+            if room_name and x_attr is not None and y_attr is not None:
+                if room_name not in seen:
+                    room = Room(room_name, (float(x_attr), -float(y_attr)))
+                    room_tags.append(room)
+                    seen.add(room_name)
+        elem.clear()
+    return SvgFloor(path_ds, room_tags)
+
+
+def load_svg(svg, tolerance=FLATTEN_TOLERANCE):
+    # Accept either a file name or an already read SvgFloor
+    if not isinstance(svg, SvgFloor):
+        svg = read_svg(svg)
+
+    rings = []
+    ids = []
+
+    for i, d in enumerate(svg.paths):
         if not d:
             continue
-        coords = svg_path_to_coords(d)
+        coords = svg_path_to_coords(d, tolerance)
 
         # Close the polygon if not already closed
         if (
@@ -64,44 +198,122 @@ def load_svg(file_name):
         ):
             # coords.append(coords[0])
             continue
-        # print(i)
-        polygon = geojson.Polygon([coords])
-        feature = geojson.Feature(geometry=polygon, properties={"id": i})
-        features.append(feature)
-
-    # Wrap as a FeatureCollection
-    gj = geojson.FeatureCollection(features)
-    print("convert to .geojson")
-    for feat in gj["features"]:
-        ring = feat["geometry"]["coordinates"][0]
-        new_ring = []
-        for x, y in ring:
-            y_flipped = -y
-            new_ring.append((x, y_flipped))
-        feat["geometry"]["coordinates"][0] = new_ring
-    print("revert the .geojson")
-
-    return gj
-
-
-def remove_duplicate_points(ring):
-    new_ring = []
-    for i in range(len(ring) - 1):
-        if ring[i] != ring[i + 1]:
-            new_ring.append(ring[i])
-    new_ring.append(ring[-1])
-    return new_ring
-
-
-def is_colinear(p1, p2, p3, tol=1e-6):
+        # Fewer than three points cannot bound an area
+        if len(coords) < 3:
+            continue
+        rings.append(coords)
+        ids.append(i)
+
+    # Flip the y coordinate so the polygons face up, then build every
+    # polygon of the floor in one call
+    lengths = [len(ring) for ring in rings]
+    coords = np.array(list(chain.from_iterable(rings)), dtype=float).reshape(-1, 2)
+    coords[:, 1] = -coords[:, 1]
+    # Keep the 6-decimal precision the GeoJSON stages used to work at
+    coords = np.round(coords, GEOJSON_PRECISION)
+    ring_ids = np.repeat(np.arange(len(rings)), lengths)
+    geometries = polygons_from_rings(coords, ring_ids)
+    print("convert to polygons")
+
+    return FloorGeometry(geometries, [{"id": i} for i in ids])
+
+
+# Cross-product magnitude below which three points count as colinear
+COLINEAR_TOLERANCE = 1e-6
+
+
+def simplify_coords(coords, ring_ids, n_rings, tol=COLINEAR_TOLERANCE):
+    """
+    Remove consecutive duplicate points and intermediate points in straight
+    segments from every ring at once.
+    coords holds the points of all rings concatenated and ring_ids the ring
+    of each point. Each interior point is tested against the last point kept
+    and the next point, as a single pass along the ring. Properly handles
+    closed rings (first == last).
+    Returns the indices of the points kept and the new length of each ring.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    x, y = coords[:, 0], coords[:, 1]
+    ring_ids = np.asarray(ring_ids, dtype=np.intp)
+
+    # 1) Drop points equal to the next point of the same ring
+    duplicate = np.zeros(len(x), dtype=bool)
+    duplicate[:-1] = (
+        (ring_ids[:-1] == ring_ids[1:]) & (x[:-1] == x[1:]) & (y[:-1] == y[1:])
+    )
+    point_ids = np.flatnonzero(~duplicate)
+    x, y, ring_ids = x[point_ids], y[point_ids], ring_ids[point_ids]
+
+    # 2) Detect the closing duplicate; only points strictly between the
+    # first and the last "real" point of a ring may be dropped
+    lengths = np.bincount(ring_ids, minlength=n_rings)
+    starts = np.cumsum(lengths) - lengths
+    first = starts[lengths > 0]
+    last = first + lengths[lengths > 0] - 1
+    closed = np.zeros(n_rings, dtype=bool)
+    closed[lengths > 0] = (x[first] == x[last]) & (y[first] == y[last])
+    open_lengths = (lengths - closed)[ring_ids]
+    position = np.arange(len(x)) - starts[ring_ids]
+    interior = (position >= 1) & (position <= open_lengths - 2)
+
+    # 3) Test every interior point against its previous point, which is the
+    # last point kept unless that one was dropped too
+    colinear = np.zeros(len(x), dtype=bool)
+    cross = (x[1:-1] - x[:-2]) * (y[2:] - y[:-2]) - (y[1:-1] - y[:-2]) * (
+        x[2:] - x[:-2]
+    )
+    colinear[1:-1] = np.abs(cross) < tol
+    drop = interior & colinear
+
+    # After a dropped point the anchor is further back, so re-test the points
+    # that follow it one by one until one is kept; from there on the
+    # neighbour test above holds again. Straight runs are short, so this
+    # loop only visits a few points
+    candidates = np.flatnonzero(drop).tolist()
+    if candidates:
+        xs, ys, inner = x.tolist(), y.tolist(), interior.tolist()
+        resume = 0
+        for i in candidates:
+            if i < resume:
+                continue
+            anchor = i - 1
+            k = i + 1
+            while inner[k]:
+                x1, y1 = xs[anchor], ys[anchor]
+                if (
+                    abs(
+                        (xs[k] - x1) * (ys[k + 1] - y1)
+                        - (ys[k] - y1) * (xs[k + 1] - x1)
+                    )
+                    < tol
+                ):
+                    drop[k] = True
+                    k += 1
+                else:
+                    drop[k] = False
+                    break
+            resume = k + 1
+
+    keep = ~drop
+    lengths = np.bincount(ring_ids[keep], minlength=n_rings)
+    return point_ids[keep], lengths
+
+
+def simplify_rings(rings, tol=COLINEAR_TOLERANCE):
     """
-    Return True if p1, p2, p3 are (approximately) colinear.
-    Uses the cross-product test with a small tolerance.
+    Simplify a list of rings given as lists of points; see simplify_coords.
+    The points kept are returned as the same objects that were passed in.
     """
-    x1, y1 = p1
-    x2, y2 = p2
-    x3, y3 = p3
-    return abs((x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)) < tol
+    lengths = [len(ring) for ring in rings]
+    points = list(chain.from_iterable(rings))
+    flat = chain.from_iterable(points)
+    coords = np.fromiter(flat, dtype=float, count=2 * len(points))
+    ring_ids = np.repeat(np.arange(len(rings)), lengths)
+    point_ids, lengths = simplify_coords(coords, ring_ids, len(rings), tol)
+
+    points = [points[i] for i in point_ids.tolist()]
+    ends = np.cumsum(lengths).tolist()
+    return [points[end - length : end] for end, length in zip(ends, lengths.tolist())]
 
 
 def simplify_ring(ring):
@@ -109,303 +321,343 @@ def simplify_ring(ring):
     Remove any intermediate points in straight segments.
     Properly handles closed rings (first == last).
     """
-    ring = remove_duplicate_points(ring)
-    if len(ring) == 1:
-        return ring
-    # 1) Detect & strip the closing duplicate
-    closed = ring[0] == ring[-1]
-    coords = ring[:-1] if closed else ring[:]
-
-    if len(coords) <= 2:
-        # Nothing to simplify
-        return ring
-
-    simplified = [coords[0]]
-    for i in range(1, len(coords) - 1):
-        p1 = simplified[-1]
-        p2 = coords[i]
-        p3 = coords[i + 1]
-
-        # Drop p2 if it lies on the line p1→p3
-        if not is_colinear(p1, p2, p3):
-            simplified.append(p2)
-
-    # Always keep the last “real” point
-    simplified.append(coords[-1])
-
-    # Re-close if it was closed
-    if closed:
-        simplified.append(simplified[0])
-
-    return simplified
-
-
-def simplify_geojson(gj):
-    keep_features = []
-    for feature in gj["features"]:
-        ring = feature["geometry"]["coordinates"][0]
-        feature["geometry"]["coordinates"][0] = simplify_ring(ring)
-        if len(feature["geometry"]["coordinates"][0]) > 2:
-            keep_features.append(feature)
-    gj["features"] = keep_features
+    return simplify_rings([ring])[0]
+
+
+def simplify_geojson(floor):
+    # Simplify all outer rings of the floor in one batch, straight from the
+    # polygons' coordinate arrays
+    coords, ring_ids = exterior_coordinates(floor.geometries)
+    point_ids, lengths = simplify_coords(coords, ring_ids, len(floor))
+    coords, ring_ids = coords[point_ids], ring_ids[point_ids]
+
+    # Keep rings with more than two points, renumbering them from 0
+    keep = lengths > 2
+    new_ids = np.cumsum(keep) - 1
+    coords, ring_ids = coords[keep[ring_ids]], new_ids[ring_ids[keep[ring_ids]]]
+    geometries = polygons_from_rings(coords, ring_ids)
+    properties = [p for p, k in zip(floor.properties, keep.tolist()) if k]
     print("remove colinear points")
-    return gj
-
-
-def normalize_polygon(polygon):
-    # Sort the coordinates to ensure consistent order
-    return tuple(sorted(map(tuple, polygon)))
-
-
-def enforce_winding_order(polygon):
-    # Use shapely to ensure the polygon has the correct winding order
-    shapely_polygon = shape({"type": "Polygon", "coordinates": [polygon]})
-    return mapping(shapely_polygon)["coordinates"][0]
-
-
-def remove_duplicate_polygons(geojson_data):
-    feature_collection = {"type": "FeatureCollection", "features": []}
-    unique_polygons_id = dict()
-    unique_polygons = []
-
-    for feature in geojson_data["features"]:
-        if feature["geometry"]["type"] == "Polygon":
-            polygon = feature["geometry"]["coordinates"][0]
-            # Enforce winding order
-            polygon = enforce_winding_order(polygon)
-            # Round coordinates to 6 decimal places and normalize
-            rounded_polygon = [(round(lon, 6), round(lat, 6)) for lon, lat in polygon]
-            polygon_tuple = normalize_polygon(rounded_polygon)
-
-            unique_polygons_id[polygon_tuple] = feature["properties"]["id"]
-
-    unique_polygons_id = list(map(lambda x: x[1], unique_polygons_id.items()))
-    cnt = 0
-    for feature in geojson_data["features"]:
-        if feature["properties"]["id"] in unique_polygons_id:
-            ans = feature.copy()
-            ans["properties"]["id"] = cnt
-            unique_polygons.append(ans)
-            cnt += 1
-    print(f"there are {len(unique_polygons)} unique polygons")
-    feature_collection["features"].extend(unique_polygons)
-    print("remove duplicate polygons")
-    return feature_collection
+    return FloorGeometry(geometries, properties)
 
 
-def remove_covered_polygons(geojson_data):
-    """
-    Remove polygons that are completely covered by other polygons.
-    Returns a new FeatureCollection with covered polygons removed.
-    """
-    features = geojson_data["features"]
-    features_to_keep = []
+# Coordinates are quantized to this many decimal places before comparing rings
+DEDUP_PRECISION = 6
 
-    for i, feature1 in enumerate(features):
-        if feature1["geometry"]["type"] != "Polygon":
-            features_to_keep.append(feature1)
-            continue
 
-        polygon1 = shape(feature1["geometry"])
-        is_covered = False
+def canonical_ring(points):
+    """
+    Return a hashable key that is the same for rings with the same
+    (quantized) vertices in the same cyclic order, whatever the starting
+    vertex or direction.
+    """
+    points = list(points)
+    # Drop the closing duplicate so rotations line up
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if not points:
+        return ()
+
+    # Start at the smallest vertex, trying both directions and every
+    # occurrence of that vertex, and keep the smallest sequence
+    start = min(points)
+    candidates = []
+    for sequence in (points, points[::-1]):
+        for i, point in enumerate(sequence):
+            if point == start:
+                candidates.append(tuple(sequence[i:] + sequence[:i]))
+    return min(candidates)
+
+
+def ring_keys(geometries, precision=DEDUP_PRECISION):
+    """Canonical key of the exterior ring of every polygon"""
+    coords, ring_ids = exterior_coordinates(geometries)
+    quantized = np.round(coords * 10**precision).astype(np.int64)
+    points = list(zip(quantized[:, 0].tolist(), quantized[:, 1].tolist()))
+    ends = np.cumsum(np.bincount(ring_ids, minlength=len(geometries))).tolist()
+    starts = [0] + ends[:-1]
+    return [canonical_ring(points[start:end]) for start, end in zip(starts, ends)]
+
+
+def remove_duplicate_polygons(floor):
+    # The last polygon with a given ring is the one kept
+    unique_polygons = dict()
+    for i, key in enumerate(ring_keys(floor.geometries)):
+        unique_polygons[key] = i
+    keep = sorted(unique_polygons.values())
+
+    geometries = floor.geometries[keep]
+    properties = [dict(floor.properties[i], id=cnt) for cnt, i in enumerate(keep)]
+    print(f"there are {len(keep)} unique polygons")
+    print("remove duplicate polygons")
+    return FloorGeometry(geometries, properties)
 
-        for j, feature2 in enumerate(features):
-            if i == j or feature2["geometry"]["type"] != "Polygon":
-                continue
 
-            polygon2 = shape(feature2["geometry"])
+def remove_covered_polygons(floor):
+    """
+    Remove polygons that are completely covered by other polygons.
+    Returns a new FloorGeometry with covered polygons removed.
+    """
+    polygons = floor.geometries
 
-            # Check if polygon1 is completely covered by polygon2
-            if polygon2.contains(polygon1):
-                is_covered = True
-                break
+    keep = np.ones(len(polygons), dtype=bool)
+    if len(polygons) > 1:
+        shapely.prepare(polygons)
+        tree = STRtree(polygons)
 
-        if not is_covered:
-            features_to_keep.append(feature1)
+        # Each pair (a, b) means polygons[a] contains polygons[b]; only bbox
+        # candidates from the tree are tested with the prepared polygon
+        containers, contained = tree.query(polygons, predicate="contains")
+        keep[contained[containers != contained]] = False
 
-    result = {"type": "FeatureCollection", "features": features_to_keep}
+    result = FloorGeometry(
+        polygons[keep], [p for p, k in zip(floor.properties, keep.tolist()) if k]
+    )
 
-    print(f"Removed {len(features) - len(features_to_keep)} covered polygons")
+    print(f"Removed {len(floor) - len(result)} covered polygons")
     return result
 
 
-def combine_overlapping_polygons(geojson_data):
+def combine_overlapping_polygons(floor):
     """
     Combine overlapping polygons into a single polygon that follows the outermost boundary.
     Only merges polygons that actually overlap (share area), not just touch.
     """
-    features = geojson_data["features"]
-    if len(features) <= 1:
-        return geojson_data
-
-    # Convert to Shapely polygons for easier manipulation
-    shapely_polygons = []
-    for feature in features:
-        if feature["geometry"]["type"] == "Polygon":
-            polygon = shape(feature["geometry"])
-            shapely_polygons.append(polygon)
-
+    shapely_polygons = floor.geometries
     if len(shapely_polygons) <= 1:
-        return geojson_data
-
-    # Find overlapping polygon groups
-    overlapping_groups = []
-    used_indices = set()
-
+        return floor
+
+    # Candidate pairs are polygons whose bounding boxes intersect; a pair
+    # overlaps only if their interiors share area (touching is not enough),
+    # which the DE-9IM pattern checks without building the intersection
+    tree = STRtree(shapely_polygons)
+    left, right = tree.query(shapely_polygons, predicate="intersects")
+    candidates = left < right
+    left, right = left[candidates], right[candidates]
+    overlaps = shapely.relate_pattern(
+        shapely_polygons[left], shapely_polygons[right], "2********"
+    )
+
+    # Union-find over the overlap edges gives the overlapping groups
+    parent = list(range(len(shapely_polygons)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(left[overlaps].tolist(), right[overlaps].tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Groups are ordered by their smallest polygon index
+    groups = dict()
     for i in range(len(shapely_polygons)):
-        if i in used_indices:
-            continue
-
-        # Start a new group with polygon i
-        current_group = [i]
-        used_indices.add(i)
-
-        # Check for overlaps with other polygons
-        changed = True
-        while changed:
-            changed = False
-            for j in range(len(shapely_polygons)):
-                if j in used_indices:
-                    continue
-
-                # Check if polygon j overlaps with any polygon in current group
-                for group_idx in current_group:
-                    if shapely_polygons[group_idx].intersects(shapely_polygons[j]):
-                        # Check if they actually overlap (share area), not just touch
-                        intersection = shapely_polygons[group_idx].intersection(
-                            shapely_polygons[j]
-                        )
-                        if intersection.area > 0:  # They share area
-                            current_group.append(j)
-                            used_indices.add(j)
-                            changed = True
-                            break
-                if changed:
-                    break
-
-        if len(current_group) > 1:
-            overlapping_groups.append(current_group)
-        else:
-            # Single polygon, no overlaps
-            overlapping_groups.append([i])
+        groups.setdefault(find(i), []).append(i)
+    overlapping_groups = list(groups.values())
 
     # Merge overlapping groups and keep non-overlapping polygons as-is
-    result_features = []
-    feature_id = 0
+    geometries = []
+    properties = []
 
     for group in overlapping_groups:
         if len(group) == 1:
             # Single polygon, no overlaps
-            original_feature = features[group[0]]
-            new_feature = geojson.Feature(
-                geometry=original_feature["geometry"],
-                properties={"id": feature_id, "merged": False},
-            )
-            result_features.append(new_feature)
-            feature_id += 1
+            geometries.append(shapely_polygons[group[0]])
+            properties.append({"id": len(properties), "merged": False})
         else:
-            # Merge overlapping polygons
-            polygons_to_merge = [shapely_polygons[i] for i in group]
-            merged_polygon = unary_union(polygons_to_merge)
-
+            # Merge overlapping polygons; the union may create multiple polygons
+            merged_polygon = unary_union(shapely_polygons[group])
             if merged_polygon.geom_type == "Polygon":
-                new_feature = geojson.Feature(
-                    geometry=mapping(merged_polygon),
-                    properties={"id": feature_id, "merged": True, "merged_from": group},
-                )
-                result_features.append(new_feature)
-                feature_id += 1
+                parts = [merged_polygon]
             elif isinstance(merged_polygon, MultiPolygon):
-                # Handle case where union creates multiple polygons
-                for i, polygon in enumerate(merged_polygon.geoms):
-                    new_feature = geojson.Feature(
-                        geometry=mapping(polygon),
-                        properties={
-                            "id": feature_id,
-                            "merged": True,
-                            "merged_from": group,
-                        },
-                    )
-                    result_features.append(new_feature)
-                    feature_id += 1
+                parts = list(merged_polygon.geoms)
+            else:
+                parts = []
+            for polygon in parts:
+                geometries.append(polygon)
+                properties.append(
+                    {"id": len(properties), "merged": True, "merged_from": group}
+                )
 
-    result = geojson.FeatureCollection(result_features)
+    result = FloorGeometry(np.array(geometries, dtype=object), properties)
 
-    original_count = len(features)
-    result_count = len(result_features)
+    original_count = len(floor)
+    result_count = len(result)
     print(f"Combined overlapping polygons: {original_count} -> {result_count} polygons")
 
     return result
 
 
-def get_room_tags(svg_file):
-    tree = ET.parse(svg_file)
-    root = tree.getroot()
-    namespaces = {"svg": "http://www.w3.org/2000/svg"}
-    seen = set()
-    room_tags = []
-    for text in root.findall(".//svg:text", namespaces):
-        # Extract the room name from the text content
-        room_name = text.text.strip() if text.text else ""
-        if not room_name:
-            continue
-        # Extract the coordinates from the attributes
-        x_attr = text.get("x")
-        y_attr = text.get("y")
-        if x_attr is None or y_attr is None:
-            continue
-        x = float(x_attr)
-        y = -float(y_attr)
-        if room_name not in seen:
-            room = Room(room_name, (x, y))
-            room_tags.append(room)
-            seen.add(room_name)
-    return room_tags
-
-
-def parse_geojson(geojson_file):
-    # with open(geojson_file) as f:
-    #     data = json.load(f)
-    data = geojson_file
+def get_room_tags(svg):
+    # Accept either a file name or an already read SvgFloor
+    if not isinstance(svg, SvgFloor):
+        svg = read_svg(svg)
+    return list(svg.room_tags)
+
+
+def parse_geojson(floor):
     polygons = []
-    for feature in data["features"]:
-        polygon = feature["geometry"]["coordinates"][0]
-        polygon_id = feature["properties"]["id"]
-        polygon = Poly(polygon_id, polygon)
-        polygons.append(polygon)
+    for geometry, properties in zip(floor.geometries, floor.properties):
+        polygons.append(Poly(properties["id"], geometry))
 
     return polygons
 
 
 def match_rooms_to_polygons(room_tags, polygons):
     matches = []
-    for room in room_tags:
-        point = Point(room.coordinates)
-        for i in range(len(polygons)):
-            polygon_coords = polygons[i].coordinates
-            p = Polygon(polygon_coords)
-            if p.contains(point):
-                matches.append({"polygon": polygons[i], "room": room})
-                break
+    if not room_tags or not polygons:
+        return matches
+
+    # Prepare every polygon once, then test each label point only
+    # against the polygons whose bounding box it falls in
+    tree = STRtree([polygon.geometry for polygon in polygons])
+    shapely.prepare(tree.geometries)
+    points = shapely.points([room.coordinates for room in room_tags])
+    room_idx, polygon_idx = tree.query(points)
+    hits = shapely.contains(tree.geometries[polygon_idx], points[room_idx])
+
+    # Each room keeps the first polygon containing it, like a linear scan would
+    first_polygon = dict()
+    for r, p in zip(room_idx[hits].tolist(), polygon_idx[hits].tolist()):
+        if r not in first_polygon or p < first_polygon[r]:
+            first_polygon[r] = p
+    for r, room in enumerate(room_tags):
+        if r in first_polygon:
+            matches.append({"polygon": polygons[first_polygon[r]], "room": room})
     return matches
 
 
-def calculate_distance(point, polygon):
-    point_geom = Point(point)
-    polygon_geom = Polygon(polygon)
-    nearest_geom = nearest_points(point_geom, polygon_geom)[1]
-    return point_geom.distance(nearest_geom)
+def min_cost_assignment(cost):
+    """
+    Solve the rectangular assignment problem for a cost matrix with the
+    Hungarian algorithm (O(n^2 m), inner loop vectorized).
+    Returns (rows, cols) such that every row (or every column, if there are
+    more rows than columns) is assigned once and the total cost is minimal.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = min_cost_assignment(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # assigned[j] is the 1-based row assigned to the 1-based column j
+    assigned = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        assigned[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = assigned[j0]
+            free = ~used
+            free[0] = False
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            j1 = int(np.argmin(np.where(free, minv, np.inf)))
+            delta = minv[j1]
+            u[assigned[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if assigned[j0] == 0:
+                break
+        # Augment along the alternating path
+        while j0:
+            j1 = way[j0]
+            assigned[j0] = assigned[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(assigned[1:])
+    rows = assigned[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
 
 
-def get_match_polygons(file_name, geojson_file, strict=True):
-    room_tags = get_room_tags(file_name)
+def distance_matrix(rooms, polygons):
+    """Distances between every room label point and every polygon"""
+    points = shapely.points([room.coordinates for room in rooms])
+    shapes = np.array([polygon.geometry for polygon in polygons], dtype=object)
+    return shapely.distance(points[:, np.newaxis], shapes[np.newaxis, :])
+
+
+def assign_unmatched_rooms(unmatched_room, unmatched_polygons):
+    """
+    Give each unmatched room its own unmatched polygon so that the total
+    label-to-polygon distance is minimal.
+    Returns the new matches and the polygons left over.
+    """
+    if not unmatched_room or not unmatched_polygons:
+        return [], list(unmatched_polygons)
+    rows, cols = min_cost_assignment(
+        distance_matrix(unmatched_room, unmatched_polygons)
+    )
+    matches = [
+        {"room": unmatched_room[r], "polygon": unmatched_polygons[c]}
+        for r, c in zip(rows.tolist(), cols.tolist())
+    ]
+    taken = set(cols.tolist())
+    leftover = [p for i, p in enumerate(unmatched_polygons) if i not in taken]
+    return matches, leftover
+
+
+def reassign_duplicated_rooms(id_to_room, leftover_polygons):
+    """
+    Move rooms that share a polygon onto the leftover polygons.
+    Every shared polygon keeps at least one of its rooms, as many leftover
+    polygons as possible get a room, and the total distance of the moved
+    rooms is minimal.
+    Returns the moves and the polygons that got no room.
+    """
+    rooms = [room for group in id_to_room.values() for room in group]
+    if not rooms or not leftover_polygons:
+        return [], list(leftover_polygons)
+
+    # Columns: the leftover polygons, then one "anchor" slot per shared
+    # polygon that must keep a room, then optional "stay" slots for the rest
+    distances = distance_matrix(rooms, leftover_polygons)
+    stay_cost = (distances.max() + 1) * (len(rooms) + 1)
+    anchor_cost = -stay_cost * (len(rooms) + 1)
+    n_groups = len(id_to_room)
+    # A room may only fill its own polygon's anchor
+    anchors = np.full((len(rooms), n_groups), np.abs(anchor_cost))
+    stays = np.full((len(rooms), len(rooms) - n_groups), stay_cost)
+    r = 0
+    for g, group in enumerate(id_to_room.values()):
+        anchors[r : r + len(group), g] = anchor_cost
+        r += len(group)
+    rows, cols = min_cost_assignment(np.hstack([distances, anchors, stays]))
+
+    # Report moves in polygon order, like the old per-polygon loop
+    moved = sorted(
+        (c, r)
+        for r, c in zip(rows.tolist(), cols.tolist())
+        if c < len(leftover_polygons)
+    )
+    moves = [{"room": rooms[r], "polygon": leftover_polygons[c]} for c, r in moved]
+    filled = {c for c, _ in moved}
+    no_tag = [p for i, p in enumerate(leftover_polygons) if i not in filled]
+    return moves, no_tag
+
+
+def get_match_polygons(svg, floor, strict=True):
+    room_tags = get_room_tags(svg)
     room_tags.sort(key=lambda room: room.name)
     i = 0
     for room in room_tags:
         print(f"{i} {room.name}")
         i += 1
 
-    polygons = parse_geojson(geojson_file)
+    polygons = parse_geojson(floor)
     print(len(room_tags))
     print(len(polygons))
     if strict:
@@ -432,12 +684,10 @@ def get_match_polygons(file_name, geojson_file, strict=True):
 
     duplicated_room = set()
     id_to_room = dict()
-    name_to_id = dict()
     for match in matches:
         cur_p = match["polygon"]
         if cur_p in duplicated_polygon:
             duplicated_room.add(match["room"])
-            name_to_id[match["room"].name] = cur_p
             if cur_p.id in id_to_room:
                 id_to_room[cur_p.id].append(match["room"])
             else:
@@ -464,42 +714,15 @@ def get_match_polygons(file_name, geojson_file, strict=True):
             == n_duplicated_polygon + n_unmatched_polygons
         )
 
-    for room in unmatched_room:
-        room_point = Point(room.coordinates)
-        distances = []
-        for polygon in unmatched_polygons:
-            polygon_coords = polygon.coordinates
-            distance = calculate_distance(room_point, polygon_coords)
-            distances.append((distance, polygon))
-        # Sort by distance
-        distances.sort(key=lambda x: x[0])
-        # Match the closest polygon
-        closest_polygon = distances[0][1]
-        matches.append({"room": room, "polygon": closest_polygon})
-        # Update matched sets
-        # Remove matched room and polygon from unmatched lists
-        unmatched_polygons.remove(closest_polygon)
-    no_tag_polygon = []
-    for polygon in unmatched_polygons:
-        # print(len(duplicated_room))
-        polygon_coords = polygon.coordinates
-        distances = []
-        for room in duplicated_room:
-            room_point = Point(room.coordinates)
-            distance = calculate_distance(room_point, polygon_coords)
-            distances.append((distance, room))
-        if len(distances) == 0:
-            no_tag_polygon.append(polygon)
-            continue
-        distances.sort(key=lambda x: x[0])
-        closest_room = distances[0][1]
-        matches.append({"room": closest_room, "polygon": polygon})
-        duplicated_room.remove(closest_room)
-        pid = name_to_id[closest_room.name].id
-        matches.remove({"room": closest_room, "polygon": name_to_id[closest_room.name]})
-        id_to_room[pid].remove(closest_room)
-        if len(id_to_room[pid]) == 1:
-            duplicated_room.remove(id_to_room[pid][0])
+    # Unmatched rooms take the remaining polygons, then the polygons still
+    # left take rooms that share a polygon with another room
+    new_matches, unmatched_polygons = assign_unmatched_rooms(
+        unmatched_room, unmatched_polygons
+    )
+    moves, no_tag_polygon = reassign_duplicated_rooms(id_to_room, unmatched_polygons)
+    moved_room = {move["room"] for move in moves}
+    matches = [match for match in matches if match["room"] not in moved_room]
+    matches += new_matches + moves
 
     # for match in matches:
     #     print(f"room {match['room'].name} is matched with polygon {match['polygon'].id}")
@@ -507,52 +730,44 @@ def get_match_polygons(file_name, geojson_file, strict=True):
     # print(len(polygons))
     assert len(room_tags) == len(matches)
 
-    # Create a list to hold all the features
-    features = []
-
-    # Iterate over the matches to create features
+    # Pair every polygon with the properties of its room
+    geometries = []
+    properties = []
     for match in matches:
         polygon = match["polygon"]
         room = match["room"]
-
-        # Create a GeoJSON feature for the polygon
-        polygon_feature = geojson.Feature(
-            geometry=geojson.Polygon([polygon.coordinates]),
-            properties={
+        geometries.append(polygon.geometry)
+        properties.append(
+            {
                 "id": polygon.id,
                 "room_name": room.name,
                 "labelPosition": room.coordinates,
-            },
+            }
         )
-
-        # Add the feature to the list
-        features.append(polygon_feature)
     for polygon in no_tag_polygon:
-        polygon_feature = geojson.Feature(
-            geometry=geojson.Polygon([polygon.coordinates]),
-            properties={
+        geometries.append(polygon.geometry)
+        properties.append(
+            {
                 "id": polygon.id,
                 "room_name": "no_tag",
                 "labelPosition": polygon.coordinates,
-            },
+            }
         )
-        features.append(polygon_feature)
 
-    # Create a FeatureCollection from the features
-    feature_collection = geojson.FeatureCollection(features)
-    return feature_collection
+    return FloorGeometry(np.array(geometries, dtype=object), properties)
 
 
 def main():
     file_name = "svg_files/Ansys-a-map.svg"
-    gj = load_svg(file_name)
-    gj = simplify_geojson(gj)
-    gj = remove_duplicate_polygons(gj)
-    gj = remove_covered_polygons(gj)
-    gj = combine_overlapping_polygons(gj)
+    svg = read_svg(file_name)
+    floor = load_svg(svg)
+    floor = simplify_geojson(floor)
+    floor = remove_duplicate_polygons(floor)
+    floor = remove_covered_polygons(floor)
+    floor = combine_overlapping_polygons(floor)
     with open(f"{file_name.replace('.svg', '')}_no_duplicates.geojson", "w") as f:
-        geojson.dump(gj, f, indent=2)
-    feature_collection = get_match_polygons(file_name, gj, strict=False)
+        geojson.dump(to_geojson(floor), f, indent=2)
+    feature_collection = to_geojson(get_match_polygons(svg, floor, strict=False))
     # Write the FeatureCollection to a GeoJSON file in geojson_files folder
     base_name = os.path.basename(file_name).replace(".svg", ".geojson")
     output_path = os.path.join("geojson_files", base_name)